@@ -0,0 +1,742 @@
+"""Route-level load test against a database seeded by ``benchmarks.seed``.
+
+Usage: ``python -m benchmarks.load [--duration 10] [--concurrency 8]
+[--scenario "GET /ebooks" ...] [--output report.json] [--baseline old.json]``
+
+Each scenario drives one route of ``routers/book.py``, ``routers/note.py`` or
+``routers/user.py``
+for ``--duration`` seconds from ``--concurrency`` workers, after a
+``--warmup``. Requests go straight into the app through ASGI, so neither a
+network nor an HTTP client is measured; latency runs until the last body
+byte is sent, before background tasks. Statements per request are read from
+the ``Server-Timing`` header (core/profiling.py), so a streamed response
+such as the catalog import reports only those run before it started.
+
+The report has p50/p95/p99 latency, throughput, status codes and query
+counts per scenario, with the commit and the seeded row counts. Every worker
+draws from its own ``random.Random(seed + worker)``, so two runs make the
+same requests in the same order. ``--baseline`` prints the change against
+an earlier report. Write scenarios add rows, so reseed with ``--reset``
+between runs that are meant to be compared exactly.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import random
+import re
+import statistics
+import subprocess
+import time
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+from uuid import uuid4
+
+from sqlalchemy import func, select
+
+from benchmarks.seed import PASSWORD, WORDS
+from core.db import get_db_context
+from main import app
+from models.book import Bookmark, Category, EBook, EBookTag, Note, Tag
+from models.user import User, UserProfile, UserReadingSession
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_SIZE = 1000
+QUERY_COUNT = re.compile(rb'desc="(\d+) queries"')
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    params: dict | list | None = None
+    json: object = None
+    form: dict | None = None
+    body: bytes | None = None
+    headers: dict = field(default_factory=dict)
+
+
+@dataclass
+class Result:
+    status: int
+    headers: dict[bytes, bytes]
+    body: bytes
+    elapsed: float
+
+
+async def send(request: Request) -> Result:
+    """Run one request through the ASGI app."""
+    body = request.body or b""
+    headers = {key.lower(): value for key, value in request.headers.items()}
+    if request.json is not None:
+        body = json.dumps(request.json, default=str).encode()
+        headers["content-type"] = "application/json"
+    elif request.form is not None:
+        body = urlencode(request.form).encode()
+        headers["content-type"] = "application/x-www-form-urlencoded"
+    headers["content-length"] = str(len(body))
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": "2.4"},
+        "http_version": "1.1",
+        "method": request.method,
+        "scheme": "http",
+        "path": request.path,
+        "raw_path": request.path.encode(),
+        "query_string": urlencode(request.params or {}, doseq=True).encode(),
+        "headers": [(k.encode(), str(v).encode()) for k, v in headers.items()],
+        "client": ("127.0.0.1", 0),
+        "server": ("bench", 80),
+    }
+    received = False
+    status, response_headers, chunks = 0, {}, []
+    finished = asyncio.get_running_loop().create_future()
+    elapsed = 0.0
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await finished
+        return {"type": "http.disconnect"}
+
+    async def send_message(message):
+        nonlocal status, response_headers, elapsed
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            response_headers = dict(message.get("headers", []))
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False) and not finished.done():
+                elapsed = time.perf_counter() - started
+                finished.set_result(None)
+
+    started = time.perf_counter()
+    try:
+        await app(scope, receive, send_message)
+    except Exception:
+        # As a server would: log it, and answer 500 unless a response started.
+        logger.exception("%s %s failed", request.method, request.path)
+        status = status or 500
+    return Result(status, response_headers, b"".join(chunks), elapsed)
+
+
+@dataclass
+class VirtualUser:
+    email: str
+    headers: dict
+    refresh_token: str
+    session_ids: list
+    reading_ebook_ids: list = field(default_factory=list)
+    note_ids: list = field(default_factory=list)
+    sync_cursor: str | None = None
+
+
+@dataclass
+class Context:
+    """Ids sampled from the seeded data, plus one logged-in user per worker."""
+
+    ebook_ids: list
+    category_ids: list
+    tag_ids: list
+    user_ids: list
+    ebook_cursors: list
+    users: list[VirtualUser] = field(default_factory=list)
+    counter: int = 0
+
+    def unique(self) -> str:
+        self.counter += 1
+        return f"{self.counter}-{uuid4().hex[:8]}"
+
+
+Prepare = Callable[[Context, VirtualUser, random.Random], Awaitable[Request]]
+
+
+@dataclass
+class Scenario:
+    name: str
+    prepare: Prepare
+    after: Callable[[Result, VirtualUser], None] | None = None
+
+
+SCENARIOS: dict[str, Scenario] = {}
+
+
+def scenario(name: str, after=None):
+    def register(prepare: Prepare) -> Prepare:
+        SCENARIOS[name] = Scenario(name, prepare, after)
+        return prepare
+
+    return register
+
+
+def search_terms(rng: random.Random) -> str:
+    return " ".join(rng.sample(WORDS, rng.choice((1, 1, 2))))
+
+
+# routers/book.py
+
+
+@scenario("GET /categories")
+async def list_categories(ctx, user, rng):
+    return Request("GET", "/categories", {"limit": 20})
+
+
+@scenario("GET /categories?id")
+async def get_category(ctx, user, rng):
+    return Request("GET", "/categories", {"id": rng.choice(ctx.category_ids)})
+
+
+@scenario("POST /categories")
+async def create_category(ctx, user, rng):
+    name = f"bench category {ctx.unique()}"
+    return Request("POST", "/categories", json={"name": name, "description": None})
+
+
+@scenario("GET /tags")
+async def list_tags(ctx, user, rng):
+    return Request("GET", "/tags", {"limit": 50})
+
+
+@scenario("GET /tags?id")
+async def get_tag(ctx, user, rng):
+    return Request("GET", "/tags", {"id": rng.choice(ctx.tag_ids)})
+
+
+@scenario("POST /tags")
+async def create_tag(ctx, user, rng):
+    return Request("POST", "/tags", json={"name": f"bench-tag-{ctx.unique()}"})
+
+
+@scenario("GET /ebooks")
+async def list_ebooks(ctx, user, rng):
+    return Request("GET", "/ebooks", {"limit": 20})
+
+
+@scenario("GET /ebooks?cursor")
+async def list_ebooks_later_page(ctx, user, rng):
+    return Request(
+        "GET", "/ebooks", {"limit": 20, "cursor": rng.choice(ctx.ebook_cursors)}
+    )
+
+
+@scenario("GET /ebooks?id")
+async def get_ebook(ctx, user, rng):
+    return Request("GET", "/ebooks", {"id": rng.choice(ctx.ebook_ids)})
+
+
+@scenario("GET /ebooks/search")
+async def search_ebooks(ctx, user, rng):
+    return Request("GET", "/ebooks/search", {"q": search_terms(rng)})
+
+
+@scenario("GET /ebooks/search?facets")
+async def search_ebooks_with_facets(ctx, user, rng):
+    return Request("GET", "/ebooks/search", {"q": search_terms(rng), "facets": "true"})
+
+
+def new_ebook(ctx: Context, rng: random.Random) -> dict:
+    return {
+        "title": search_terms(rng).title(),
+        "author": "Bench Author",
+        "description": " ".join(rng.choices(WORDS, k=20)),
+        "file_url": f"https://files.bench.example/{ctx.unique()}.epub",
+        "cover_image": None,
+        "category_id": str(rng.choice(ctx.category_ids)),
+    }
+
+
+@scenario("POST /ebooks")
+async def create_ebook(ctx, user, rng):
+    return Request("POST", "/ebooks", json=new_ebook(ctx, rng))
+
+
+@scenario("POST /ebooks/import")
+async def import_ebooks(ctx, user, rng):
+    body = "".join(json.dumps(new_ebook(ctx, rng)) + "\n" for _ in range(200))
+    return Request(
+        "POST",
+        "/ebooks/import",
+        body=body.encode(),
+        headers={"content-type": "application/x-ndjson"},
+    )
+
+
+@scenario("PUT /ebooks/tags")
+async def tag_ebooks(ctx, user, rng):
+    return Request(
+        "PUT",
+        "/ebooks/tags",
+        json={
+            str(ebook_id): [str(tag_id) for tag_id in rng.sample(ctx.tag_ids, 3)]
+            for ebook_id in rng.sample(ctx.ebook_ids, 50)
+        },
+    )
+
+
+@scenario("PUT /ebooks/tags/{ebook_id}")
+async def tag_ebook(ctx, user, rng):
+    return Request(
+        "PUT",
+        f"/ebooks/tags/{rng.choice(ctx.ebook_ids)}",
+        json=[str(tag_id) for tag_id in rng.sample(ctx.tag_ids, 3)],
+    )
+
+
+@scenario("GET /user/bookmarks")
+async def my_bookmarks(ctx, user, rng):
+    return Request("GET", "/user/bookmarks", headers=user.headers)
+
+
+@scenario("GET /user/bookmarks/grouped")
+async def my_bookmarks_grouped(ctx, user, rng):
+    return Request("GET", "/user/bookmarks/grouped", headers=user.headers)
+
+
+@scenario("POST /user/bookmarks/{ebook_id}")
+async def add_bookmark(ctx, user, rng):
+    return Request(
+        "POST",
+        f"/user/bookmarks/{rng.choice(ctx.ebook_ids)}",
+        {"page_number": rng.randint(1, 400)},
+        headers=user.headers,
+    )
+
+
+# routers/note.py
+
+
+def new_notes(ebook_id, rng: random.Random, count: int) -> list[dict]:
+    return [
+        {
+            "ebook_id": str(ebook_id),
+            "page_number": rng.randint(1, 400),
+            "content": " ".join(rng.choices(WORDS, k=rng.randint(5, 30))),
+        }
+        for _ in range(count)
+    ]
+
+
+@scenario("POST /user/notes")
+async def create_notes(ctx, user, rng):
+    return Request(
+        "POST",
+        "/user/notes",
+        json=new_notes(rng.choice(ctx.ebook_ids), rng, 50),
+        headers=user.headers,
+    )
+
+
+@scenario("PATCH /user/notes")
+async def update_notes(ctx, user, rng):
+    return Request(
+        "PATCH",
+        "/user/notes",
+        json=[
+            {"id": id, "content": search_terms(rng)}
+            for id in rng.sample(user.note_ids, min(5, len(user.note_ids)))
+        ],
+        headers=user.headers,
+    )
+
+
+@scenario("GET /user/notes/{ebook_id}")
+async def notes_on_ebook(ctx, user, rng):
+    return Request(
+        "GET",
+        f"/user/notes/{rng.choice(user.reading_ebook_ids)}",
+        headers=user.headers,
+    )
+
+
+@scenario("GET /user/notes/search")
+async def search_notes(ctx, user, rng):
+    return Request(
+        "GET", "/user/notes/search", {"q": search_terms(rng)}, headers=user.headers
+    )
+
+
+# routers/user.py
+
+
+@scenario("POST /login")
+async def login(ctx, user, rng):
+    return Request(
+        "POST", "/login", form={"username": user.email, "password": PASSWORD}
+    )
+
+
+def keep_refresh_token(result: Result, user: VirtualUser) -> None:
+    if result.status == 200:
+        tokens = json.loads(result.body)
+        user.refresh_token = tokens["refresh_token"]
+        user.headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+@scenario("POST /token/refresh", after=keep_refresh_token)
+async def refresh(ctx, user, rng):
+    return Request("POST", "/token/refresh", json={"refresh_token": user.refresh_token})
+
+
+@scenario("GET /me")
+async def me(ctx, user, rng):
+    return Request("GET", "/me", headers=user.headers)
+
+
+@scenario("GET /user")
+async def list_users(ctx, user, rng):
+    return Request("GET", "/user", {"limit": 20})
+
+
+@scenario("GET /user?id")
+async def get_user(ctx, user, rng):
+    return Request("GET", "/user", {"id": rng.choice(ctx.user_ids)})
+
+
+@scenario("POST /user")
+async def create_user(ctx, user, rng):
+    email = f"bench-{ctx.unique()}@bench.example"
+    return Request(
+        "POST", "/user", json={"email": email, "password": PASSWORD, "full_name": None}
+    )
+
+
+@scenario("PUT /user")
+async def change_password(ctx, user, rng):
+    return Request(
+        "PUT",
+        "/user",
+        json={"old_password": PASSWORD, "new_password": PASSWORD},
+        headers=user.headers,
+    )
+
+
+@scenario("DELETE /user")
+async def delete_user(ctx, user, rng):
+    # A throwaway account, created and logged in outside the timing (which
+    # also leaves it out of this scenario's throughput).
+    email = f"bench-{ctx.unique()}@bench.example"
+    await send(
+        Request(
+            "POST",
+            "/user",
+            json={"email": email, "password": PASSWORD, "full_name": None},
+        )
+    )
+    tokens = json.loads(
+        (
+            await send(
+                Request(
+                    "POST", "/login", form={"username": email, "password": PASSWORD}
+                )
+            )
+        ).body
+    )
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    return Request("DELETE", "/user", headers=headers)
+
+
+@scenario("GET /user/sync")
+async def full_sync(ctx, user, rng):
+    return Request("GET", "/user/sync", headers=user.headers)
+
+
+@scenario("GET /user/sync?cursor")
+async def delta_sync(ctx, user, rng):
+    return Request(
+        "GET", "/user/sync", {"cursor": user.sync_cursor}, headers=user.headers
+    )
+
+
+@scenario("GET /user/reading-sessions")
+async def my_reading_sessions(ctx, user, rng):
+    return Request("GET", "/user/reading-sessions", headers=user.headers)
+
+
+@scenario("GET /user/reading-sessions?id")
+async def get_reading_session(ctx, user, rng):
+    return Request(
+        "GET",
+        "/user/reading-sessions",
+        {"id": rng.choice(user.session_ids)},
+        headers=user.headers,
+    )
+
+
+@scenario("POST /user/reading-sessions/{ebook_id}")
+async def start_reading_session(ctx, user, rng):
+    return Request(
+        "POST",
+        f"/user/reading-sessions/{rng.choice(ctx.ebook_ids)}",
+        headers=user.headers,
+    )
+
+
+@scenario("PUT /user/reading-sessions/{session_id}")
+async def turn_page(ctx, user, rng):
+    return Request(
+        "PUT",
+        f"/user/reading-sessions/{rng.choice(user.session_ids)}",
+        {"last_page": rng.randint(1, 400)},
+        headers=user.headers,
+    )
+
+
+async def sample_ids(model) -> list:
+    async with get_db_context() as db:
+        return list(
+            await db.scalars(
+                select(model.id)
+                .where(model.is_deleted.is_(False), model.is_active)
+                .order_by(model.id)
+                .limit(SAMPLE_SIZE)
+            )
+        )
+
+
+async def row_counts() -> dict[str, int]:
+    models = (
+        Category,
+        Tag,
+        User,
+        UserProfile,
+        EBook,
+        EBookTag,
+        Bookmark,
+        UserReadingSession,
+        Note,
+    )
+    async with get_db_context() as db:
+        return {
+            model.__tablename__: await db.scalar(
+                select(func.count()).select_from(model)
+            )
+            for model in models
+        }
+
+
+async def build_context(concurrency: int) -> Context:
+    ctx = Context(
+        ebook_ids=await sample_ids(EBook),
+        category_ids=await sample_ids(Category),
+        tag_ids=await sample_ids(Tag),
+        user_ids=await sample_ids(User),
+        ebook_cursors=[],
+    )
+    cursor = None
+    for _ in range(20):
+        params = {"limit": 20} | ({"cursor": cursor} if cursor else {})
+        cursor = json.loads((await send(Request("GET", "/ebooks", params))).body)[
+            "next_cursor"
+        ]
+        if cursor is None:
+            break
+        ctx.ebook_cursors.append(cursor)
+    for worker in range(concurrency):
+        email = f"user{worker}@bench.example"
+        result = await send(
+            Request("POST", "/login", form={"username": email, "password": PASSWORD})
+        )
+        if result.status != 200:
+            raise SystemExit(f"Cannot log in as {email}; run benchmarks.seed first.")
+        tokens = json.loads(result.body)
+        user = VirtualUser(
+            email,
+            {"Authorization": f"Bearer {tokens['access_token']}"},
+            tokens["refresh_token"],
+            [],
+        )
+        sessions = await send(
+            Request("GET", "/user/reading-sessions", headers=user.headers)
+        )
+        sessions = json.loads(sessions.body)
+        user.session_ids = [session["id"] for session in sessions]
+        user.reading_ebook_ids = [session["ebook_id"] for session in sessions]
+        for ebook_id in user.reading_ebook_ids:
+            notes = await send(
+                Request("GET", f"/user/notes/{ebook_id}", headers=user.headers)
+            )
+            user.note_ids += [note["id"] for note in json.loads(notes.body)["items"]]
+        # Drained once, so the delta scenario only sees what changes after.
+        while True:
+            params = {"cursor": user.sync_cursor} if user.sync_cursor else None
+            sync = json.loads(
+                (
+                    await send(
+                        Request("GET", "/user/sync", params, headers=user.headers)
+                    )
+                ).body
+            )
+            user.sync_cursor = sync["cursor"]
+            if not sync["has_more"]:
+                break
+        ctx.users.append(user)
+    return ctx
+
+
+async def run_scenario(
+    scenario: Scenario,
+    ctx: Context,
+    concurrency: int,
+    duration: float,
+    warmup: float,
+    seed: int,
+) -> dict:
+    latencies, queries, statuses = [], [], Counter()
+    loop = asyncio.get_running_loop()
+    measure_from = loop.time() + warmup
+    stop_at = measure_from + duration
+
+    async def worker(number: int):
+        rng = random.Random(seed + number)
+        user = ctx.users[number]
+        while loop.time() < stop_at:
+            request = await scenario.prepare(ctx, user, rng)
+            result = await send(request)
+            if scenario.after is not None:
+                scenario.after(result, user)
+            if loop.time() < measure_from:
+                continue
+            latencies.append(result.elapsed)
+            statuses[result.status] += 1
+            timing = result.headers.get(b"server-timing", b"")
+            if match := QUERY_COUNT.search(timing):
+                queries.append(int(match.group(1)))
+
+    await asyncio.gather(*(worker(number) for number in range(concurrency)))
+    return summarize(latencies, queries, statuses, duration)
+
+
+def summarize(latencies, queries, statuses, duration) -> dict:
+    if len(latencies) < 2:
+        percentiles = dict.fromkeys(("p50", "p95", "p99"), None)
+    else:
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+        percentiles = {
+            "p50": cuts[49] * 1000,
+            "p95": cuts[94] * 1000,
+            "p99": cuts[98] * 1000,
+        }
+    return {
+        "requests": len(latencies),
+        "throughput_rps": len(latencies) / duration,
+        "errors": sum(count for status, count in statuses.items() if status >= 400),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "latency_ms": percentiles
+        | {
+            "mean": statistics.fmean(latencies) * 1000 if latencies else None,
+            "max": max(latencies) * 1000 if latencies else None,
+        },
+        "queries_per_request": {
+            "mean": statistics.fmean(queries) if queries else None,
+            "max": max(queries) if queries else None,
+        },
+    }
+
+
+def git_revision() -> dict:
+    def git(*args):
+        try:
+            return subprocess.run(
+                ["git", *args], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "-uno")),
+    }
+
+
+def print_summary(report: dict, baseline: dict | None) -> None:
+    print(
+        f"{'scenario':<42} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'q/req':>6} {'err':>5}"
+    )
+    for name, stats in report["scenarios"].items():
+        latency = stats["latency_ms"]
+        cells = [
+            f"{stats['throughput_rps']:>8.1f}",
+            *(
+                f"{latency[p]:>8.2f}" if latency[p] is not None else f"{'-':>8}"
+                for p in ("p50", "p95", "p99")
+            ),
+            f"{stats['queries_per_request']['mean'] or 0:>6.1f}",
+            f"{stats['errors']:>5}",
+        ]
+        line = f"{name:<42} " + " ".join(cells)
+        before = (baseline or {}).get("scenarios", {}).get(name)
+        if before and before["latency_ms"]["p50"] and latency["p50"]:
+            change = latency["p50"] / before["latency_ms"]["p50"] - 1
+            line += f"   p50 {change:+.0%}"
+        print(line)
+
+
+async def run(args) -> dict:
+    names = args.scenario or list(SCENARIOS)
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {sorted(unknown)}")
+    report = {
+        **git_revision(),
+        "started_at": datetime.now(tz=timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "config": {
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+        },
+        "rows": await row_counts(),
+        "scenarios": {},
+    }
+    async with app.router.lifespan_context(app):
+        ctx = await build_context(args.concurrency)
+        for name in names:
+            report["scenarios"][name] = await run_scenario(
+                SCENARIOS[name],
+                ctx,
+                args.concurrency,
+                args.duration,
+                args.warmup,
+                args.seed,
+            )
+            print(f"  done {name}", flush=True)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--scenario", action="append", help="repeatable; default all")
+    parser.add_argument("--output", default="benchmark-report.json")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    parser.add_argument("--list", action="store_true", help="list scenarios and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        print("\n".join(SCENARIOS))
+        return
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    report = asyncio.run(run(args))
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print_summary(report, baseline)
+    print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""Seeded synthetic dataset for benchmarks.
+
+Usage: ``python -m benchmarks.seed --scale 10k|1m|10m [--seed 42] [--reset]``
+
+Loads users (with profiles), categories, tags, ebooks, ebook tags, bookmarks,
+reading sessions and notes through COPY, one table per statement, then ANALYZEs.
+The scale is the approximate total row count. The same seed and scale give
+the same rows, ids included, so runs on different commits see the same
+data. Ids are UUIDv7s with made-up timestamps in insertion order, which
+keeps the primary key indexes laid out as they would be in production.
+
+Every user is ``user{n}@bench.example`` with the password
+:data:`PASSWORD`. ``--reset`` truncates the tables first; without it the
+load refuses to run on a database that already has users or ebooks.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from uuid import UUID
+
+from sqlalchemy import func, select, text
+
+from core.auth.security import get_password_hash, pwd_context
+from core.db import get_db_context
+from models.book import EBook
+from models.user import User
+
+PASSWORD = "benchmark-password"
+SCALES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+# Made-up UUIDv7 timestamps start here: 2024-01-01T00:00:00Z.
+EPOCH_MS = 1_704_067_200_000
+
+TABLES = (
+    "category",
+    "tag",
+    '"user"',
+    "userprofile",
+    "ebook",
+    "ebooktag",
+    "bookmark",
+    "userreadingsession",
+    "note",
+    "refreshtoken",
+)
+
+BOOKMARKS_PER_USER = 6
+SESSIONS_PER_USER = 3
+TAGS_PER_EBOOK = 3
+NOTES_PER_SESSION = 2
+
+# Titles and descriptions are drawn from these, so search has real hits.
+WORDS = (
+    "ancient arrow autumn becoming birds black blood bridge broken burning "
+    "children city clockwork cold crown dark daughter dawn dead deep desert "
+    "dragon dream dune dust earth echo empire end engine falling father "
+    "fire forest forgotten frost garden ghost glass gold grave green harbor "
+    "heart hidden hollow house hunger ice iron island journey kingdom "
+    "last light lion lost machine memory midnight mirror moon mountain "
+    "night north ocean orchard paper past queen rain red river road salt "
+    "sand sea secret shadow ship silence silver sky snow song spice stars "
+    "stone storm summer sun sword thief thorn throne tide time tower tree "
+    "valley voice war water wind winter wolf world worm"
+).split()
+AUTHORS = [f"{first} {last}" for first in WORDS[:40] for last in WORDS[-25:]]
+
+
+def row_counts(total: int) -> dict[str, int]:
+    users = max(10, total // 20)
+    ebooks = max(50, total // 10)
+    return {
+        "category": max(20, total // 50_000),
+        "tag": max(200, total // 5_000),
+        "user": users,
+        "userprofile": users,
+        "ebook": ebooks,
+        "ebooktag": ebooks * TAGS_PER_EBOOK,
+        "bookmark": users * BOOKMARKS_PER_USER,
+        "userreadingsession": users * SESSIONS_PER_USER,
+        "note": users * SESSIONS_PER_USER * NOTES_PER_SESSION,
+    }
+
+
+class Ids:
+    """Time-ordered UUIDv7s whose random bits come from ``rng``."""
+
+    def __init__(self, rng: random.Random) -> None:
+        self.rng = rng
+        self.ms = EPOCH_MS
+
+    def next(self) -> UUID:
+        self.ms += 1
+        return UUID(
+            int=(self.ms << 80)
+            | (0x7 << 76)
+            | (self.rng.getrandbits(12) << 64)
+            | (0b10 << 62)
+            | self.rng.getrandbits(62)
+        )
+
+    def take(self, count: int) -> list[UUID]:
+        return [self.next() for _ in range(count)]
+
+
+def words(rng: random.Random, count: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+
+def popular(rng: random.Random, items: list):
+    """Pick with a skew towards the front, so some books are much more popular."""
+    return items[int(len(items) * rng.random() ** 2)]
+
+
+async def copy(db, table: str, columns: tuple[str, ...], records) -> int:
+    connection = await db.connection()
+    raw = await connection.get_raw_connection()
+    result = await raw.driver_connection.copy_records_to_table(
+        table.strip('"'), columns=columns, records=records
+    )
+    return int(result.split()[-1])
+
+
+async def seed(total: int, seed: int, reset: bool) -> dict[str, int]:
+    counts = row_counts(total)
+    rng = random.Random(seed)
+    ids = Ids(rng)
+    password = await get_password_hash(PASSWORD)
+    live = (False, True)  # is_deleted, is_active
+
+    async with get_db_context() as db:
+        if reset:
+            await db.execute(text(f"TRUNCATE {', '.join(TABLES)} CASCADE"))
+        elif await db.scalar(select(func.count()).select_from(User)) or (
+            await db.scalar(select(func.count()).select_from(EBook))
+        ):
+            raise SystemExit("Database is not empty; pass --reset to truncate it.")
+
+        loaded = {}
+        category_ids = ids.take(counts["category"])
+        loaded["category"] = await copy(
+            db,
+            "category",
+            ("id", "name", "description", "is_deleted", "is_active"),
+            (
+                (id, f"Category {n}", words(rng, 8), *live)
+                for n, id in enumerate(category_ids)
+            ),
+        )
+        tag_ids = ids.take(counts["tag"])
+        loaded["tag"] = await copy(
+            db,
+            "tag",
+            ("id", "name", "is_deleted", "is_active"),
+            ((id, f"tag-{n}", *live) for n, id in enumerate(tag_ids)),
+        )
+        user_ids = ids.take(counts["user"])
+        loaded["user"] = await copy(
+            db,
+            '"user"',
+            ("id", "email", "password", "full_name", "is_deleted", "is_active"),
+            (
+                (id, f"user{n}@bench.example", password, words(rng, 2), *live)
+                for n, id in enumerate(user_ids)
+            ),
+        )
+        loaded["userprofile"] = await copy(
+            db,
+            "userprofile",
+            ("id", "user_id", "dark_mode", "is_deleted", "is_active"),
+            ((ids.next(), id, rng.random() < 0.3, *live) for id in user_ids),
+        )
+        ebook_ids = ids.take(counts["ebook"])
+        loaded["ebook"] = await copy(
+            db,
+            "ebook",
+            (
+                "id",
+                "title",
+                "author",
+                "description",
+                "file_url",
+                "category_id",
+                "is_deleted",
+                "is_active",
+            ),
+            (
+                (
+                    id,
+                    words(rng, rng.randint(2, 5)).title(),
+                    rng.choice(AUTHORS).title(),
+                    words(rng, rng.randint(10, 40)),
+                    f"https://files.bench.example/{id}.epub",
+                    rng.choice(category_ids),
+                    *live,
+                )
+                for id in ebook_ids
+            ),
+        )
+        loaded["ebooktag"] = await copy(
+            db,
+            "ebooktag",
+            ("ebook_id", "tag_id", "is_deleted", "is_active"),
+            (
+                (ebook_id, tag_id, *live)
+                for ebook_id in ebook_ids
+                for tag_id in rng.sample(tag_ids, TAGS_PER_EBOOK)
+            ),
+        )
+        # Page numbers are distinct per user, so (user, ebook, page) is unique.
+        loaded["bookmark"] = await copy(
+            db,
+            "bookmark",
+            ("id", "user_id", "ebook_id", "page_number", "is_deleted", "is_active"),
+            (
+                (ids.next(), user_id, popular(rng, ebook_ids), page, *live)
+                for user_id in user_ids
+                for page in rng.sample(range(1, 500), BOOKMARKS_PER_USER)
+            ),
+        )
+        sessions = [
+            (user_id, ebook_id)
+            for user_id in user_ids
+            for ebook_id in rng.sample(ebook_ids, SESSIONS_PER_USER)
+        ]
+        loaded["userreadingsession"] = await copy(
+            db,
+            "userreadingsession",
+            ("id", "user_id", "ebook_id", "last_page", "is_deleted", "is_active"),
+            (
+                (ids.next(), user_id, ebook_id, rng.randint(1, 400), *live)
+                for user_id, ebook_id in sessions
+            ),
+        )
+        # Notes are on the books being read.
+        loaded["note"] = await copy(
+            db,
+            "note",
+            (
+                "id",
+                "user_id",
+                "ebook_id",
+                "page_number",
+                "content",
+                "is_deleted",
+                "is_active",
+            ),
+            (
+                (
+                    ids.next(),
+                    user_id,
+                    ebook_id,
+                    rng.randint(1, 400),
+                    words(rng, rng.randint(5, 30)),
+                    *live,
+                )
+                for user_id, ebook_id in sessions
+                for _ in range(NOTES_PER_SESSION)
+            ),
+        )
+        await db.commit()
+        await db.execute(text("ANALYZE"))
+        await db.commit()
+    return loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    size = parser.add_mutually_exclusive_group(required=True)
+    size.add_argument("--scale", choices=SCALES)
+    size.add_argument("--rows", type=int, help="approximate total row count")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    total = args.rows or SCALES[args.scale]
+    try:
+        loaded = asyncio.run(seed(total, args.seed, args.reset))
+    finally:
+        pwd_context.shutdown()
+    elapsed = time.perf_counter() - started
+    for table, count in loaded.items():
+        print(f"{table:>20} {count:>10}")
+    rows = sum(loaded.values())
+    print(f"{rows} rows in {elapsed:.1f}s ({rows / elapsed:.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Per-item cost of serializing a ``GET /ebooks`` page.
+
+Usage: ``python -m benchmarks.serialization [--sizes 50 200 1000]``
+
+Builds pages of transient ``EBook`` objects, each with three tags and five
+bookmarks, and times FastAPI's ``response_model`` path (validate, dump to
+Python, ``json.dumps``) against :func:`core.serialization.dump_json`. No
+database is involved; both paths must produce the same JSON. Small pages are
+dominated by per-response overhead, so compare at the sizes the routes serve.
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import time
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+from uuid_extensions import uuid7
+
+from core.serialization import dump_json
+from models.book import Bookmark, EBook, EBookTag, Tag
+from routers.book import app as book_router
+from schema import Page
+from schema.book import EBookSchema
+
+
+def make_page(size: int) -> dict:
+    tags = [Tag(id=uuid7(), name=f"tag {i}") for i in range(20)]
+    category_id = uuid7()
+    items = []
+    for i in range(size):
+        ebook = EBook(
+            id=uuid7(),
+            title=f"Title {i}",
+            author="Author",
+            description="A reasonably long description " * 5,
+            file_url=f"https://files.example/{i}.epub",
+            cover_image=None,
+            category_id=category_id,
+        )
+        ebook.tags = [EBookTag(tag=tags[(i + j) % len(tags)]) for j in range(3)]
+        ebook.bookmarks = [Bookmark(id=uuid7(), page_number=p) for p in range(5)]
+        items.append(ebook)
+    return {"items": items, "next_cursor": "cursor"}
+
+
+def ebooks_response_field():
+    for route in book_router.routes:
+        if isinstance(route, APIRoute) and route.path == "/ebooks":
+            if "GET" in route.methods:
+                return route.secure_cloned_response_field
+    raise LookupError("GET /ebooks is not registered")
+
+
+def best_of(repeat: int, fn) -> float:
+    """Fastest of ``repeat`` calls, with the collector off as in ``timeit``."""
+    timings = []
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - started)
+    finally:
+        gc.enable()
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    field = ebooks_response_field()
+    loop = asyncio.new_event_loop()
+
+    def fastapi_path(page):
+        content = loop.run_until_complete(
+            serialize_response(field=field, response_content=page)
+        )
+        return JSONResponse(content).body
+
+    print(f"{'items':>6} {'response_model us/item':>24} {'dump_json us/item':>18}")
+    for size in args.sizes:
+        page = make_page(size)
+        assert json.loads(fastapi_path(page)) == json.loads(
+            dump_json(Page[EBookSchema], page)
+        )
+        slow = best_of(args.repeat, lambda page=page: fastapi_path(page))
+        fast = best_of(
+            args.repeat, lambda page=page: dump_json(Page[EBookSchema], page)
+        )
+        print(
+            f"{size:>6} {slow / size * 1e6:>24.1f} {fast / size * 1e6:>18.1f}"
+            f"   ({slow / fast:.1f}x)"
+        )
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
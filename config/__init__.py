@@ -1,10 +1,11 @@
 import os
 from functools import lru_cache
 from pathlib import Path
+from typing import Annotated, Literal
 
-from pydantic import PostgresDsn
+from pydantic import Field, PostgresDsn, field_validator
 from pydantic_settings import BaseSettings as PydanticBaseSettings
-from pydantic_settings import SettingsConfigDict
+from pydantic_settings import NoDecode, SettingsConfigDict
 
 BASE_DIR = Path(__file__).parent.parent
 
@@ -54,6 +55,15 @@ class AuthTokenConfig(BaseSettings):
     access_token_expire_minutes: int
     refresh_token_expire_minutes: int
     algorithm: str
+    # bcrypt runs in its own process pool; requests beyond max_pending waiting
+    # or running password operations are rejected with 503.
+    password_hash_workers: int = 2
+    password_hash_max_pending: int = 32
+    # Target bcrypt cost; pick it with `python -m core.auth.calibrate`. Stored
+    # hashes with another cost are rehashed on the next successful login.
+    bcrypt_rounds: int = Field(12, ge=4, le=31)
+    # Decoded access tokens kept in memory until their exp; 0 disables.
+    token_cache_size: int = 10_000
 
 
 class DBConfig(BaseSettings):
@@ -63,8 +73,56 @@ class DBConfig(BaseSettings):
     pool_timeout: int = 30
     pool_recycle: int = 3600
     pool_pre_ping: bool = True
+    # Opt-in write-behind for reading progress (core/db/write_behind.py):
+    # page turns are acknowledged at once and written in batches at most
+    # max_staleness seconds later, or as soon as max_pending sessions wait.
+    reading_progress_write_behind: bool = False
+    reading_progress_max_staleness: float = Field(2.0, gt=0)
+    reading_progress_max_pending: int = Field(10_000, ge=1)
+    # Per-request query profiling (core/profiling.py): a statement executed
+    # n_plus_one_threshold times in one request is logged as a likely N+1,
+    # and one slower than slow_query_ms is logged with its route.
+    n_plus_one_threshold: int = Field(5, ge=2)
+    slow_query_ms: float = Field(200.0, gt=0)
+    server_timing: bool = True
+    # Optional read replicas (core/db/replicas.py), comma separated. Read-only
+    # routes spread over the healthy ones; a client that wrote is kept on the
+    # primary for read_your_writes_seconds so it sees its own changes.
+    replica_database_url: Annotated[list[PostgresDsn], NoDecode] = []
+    replica_pool_size: int = 50
+    replica_health_interval: float = Field(5.0, gt=0)
+    replica_max_lag_seconds: float = Field(10.0, gt=0)
+    read_your_writes_seconds: float = Field(5.0, ge=0)
+    # Archiving (core/db/archive.py): rows soft-deleted archive_after_days ago
+    # move to <table>_archive in batches, pausing between them, and expired
+    # refresh tokens are deleted. The app runs it every
+    # archive_interval_seconds; 0 leaves it to cron. At least a day, so
+    # GET /user/sync clients get to see tombstones before they are archived.
+    archive_after_days: int = Field(30, ge=1)
+    archive_batch_size: int = Field(1000, ge=1)
+    archive_pause_seconds: float = Field(0.5, ge=0)
+    archive_interval_seconds: float = Field(0.0, ge=0)
+    # GET /user/sync holds back changes younger than sync_settle_seconds, so a
+    # write still committing cannot land behind a cursor already handed out.
+    sync_settle_seconds: float = Field(5.0, ge=0)
+
+    @field_validator("replica_database_url", mode="before")
+    @classmethod
+    def split_urls(cls, value):
+        if isinstance(value, str):
+            return [url.strip() for url in value.split(",") if url.strip()]
+        return value
+
+
+class CacheConfig(BaseSettings):
+    # Response cache for the category/tag catalogs (core/cache.py). Entries
+    # are dropped on writes in this process and expire after ttl elsewhere.
+    cache_backend: Literal["memory", "none"] = "memory"
+    cache_ttl_seconds: float = Field(300.0, gt=0)
+    cache_max_entries: int = Field(1024, ge=1)
 
 
 auth_config = AuthTokenConfig()  # type: ignore
 db_config = DBConfig()  # type: ignore
 base_config = BaseConfig()
+cache_config = CacheConfig()
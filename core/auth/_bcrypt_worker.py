@@ -0,0 +1,23 @@
+"""bcrypt entry points run inside the password-hashing worker processes.
+
+Kept free of application imports so a spawned worker only loads bcrypt.
+Each call reports how long it sat in the queue and how long bcrypt took;
+``time.monotonic`` is system-wide on Linux, so the submit timestamp taken in
+the parent is comparable.
+"""
+
+import time
+
+import bcrypt
+
+
+def checkpw(password: bytes, hashed: bytes, submitted_at: float):
+    started = time.monotonic()
+    result = bcrypt.checkpw(password, hashed)
+    return result, started - submitted_at, time.monotonic() - started
+
+
+def hashpw(password: bytes, rounds: int, submitted_at: float):
+    started = time.monotonic()
+    result = bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+    return result, started - submitted_at, time.monotonic() - started
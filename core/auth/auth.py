@@ -1,26 +1,45 @@
+import logging
+import time
 from datetime import datetime, timedelta, timezone
 
 import jwt
-from fastapi import Security
+from fastapi import BackgroundTasks, Security
 from fastapi.security import OAuth2PasswordBearer
 from jwt import DecodeError as JWTError
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+from uuid_extensions import uuid7
 
+from config import auth_config
 from core.auth.security import (
     ACCESS_TOKEN_EXPIRE_MINUTES,
     ALGORITHM,
+    JWT_DURATION,
+    REFRESH_SECRET_KEY,
+    REFRESH_TOKEN_EXPIRE_MINUTES,
     SECRET_KEY,
     create_refresh_token,
+    get_password_hash,
+    pwd_context,
     verify_password,
 )
+from core.auth.token_cache import TokenCache
+from core.db import get_db_context
 from core.exception import (
     AUTHENTICATION_EXCEPTION,
+    REFRESH_TOKEN_EXCEPTION,
     AuthenticationError,
+    ServiceUnavailable,
 )
-from models.user import User
+from core.profiling import timed
+from models.user import RefreshToken, User
 from schema.user import Token
 
+logger = logging.getLogger(__name__)
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
+token_cache = TokenCache(max_size=auth_config.token_cache_size)
 
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
@@ -29,20 +48,59 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
         expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     )
     to_encode.update({"exp": expire})
+    started = time.perf_counter()
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    JWT_DURATION.labels("encode").observe(time.perf_counter() - started)
     return encoded_jwt
 
 
-def authenticate_user(username: str, password: str, db: Session):
-    user = db.query(User).filter(User.email == username, User.is_active)
-    user = user.first()
-    if not user or not verify_password(password, user.password):
+async def rehash_password(user_id, password: str, old_hash: str):
+    """Re-hash a verified password at the configured cost and store it.
+
+    The update is conditional on the old hash so a password change that lands
+    in the meantime is never overwritten.
+    """
+    try:
+        new_hash = await get_password_hash(password)
+    except ServiceUnavailable:
+        # Busy; the next login will try again.
+        return
+    async with get_db_context() as db:
+        await db.execute(
+            update(User)
+            .where(User.id == user_id, User.password == old_hash)
+            .values(password=new_hash)
+        )
+        await db.commit()
+    logger.info("Rehashed password for user %s at cost %s", user_id, pwd_context.rounds)
+
+
+async def authenticate_user(
+    username: str,
+    password: str,
+    db: AsyncSession,
+    background_tasks: BackgroundTasks | None = None,
+):
+    user = await db.scalar(
+        select(User)
+        .where(User.email == username, User.is_active)
+        .options(selectinload(User.profile))
+    )
+    with timed("auth"):
+        verified = user is not None and await verify_password(password, user.password)
+    if not verified:
         raise AUTHENTICATION_EXCEPTION
+    if background_tasks is not None and pwd_context.needs_rehash(user.password):
+        background_tasks.add_task(rehash_password, user.id, password, user.password)
     return user
 
 
-def login_for_access_token(username: str, password: str, db: Session):
-    user = authenticate_user(username, password, db)
+async def issue_tokens(user: User, db: AsyncSession, family_id=None) -> Token:
+    """Mint an access token and a tracked refresh token for ``user``.
+
+    ``user.profile`` must already be loaded. A new login starts a new
+    refresh-token family; a refresh continues the caller's family.
+    """
     access_token = create_access_token(
         data={
             "sub": str(user.id),
@@ -51,19 +109,101 @@ def login_for_access_token(username: str, password: str, db: Session):
         }
     )
     # Create refresh token
-    refresh_token = create_refresh_token(data={"sub": str(user.id)})
+    expires_delta = timedelta(minutes=REFRESH_TOKEN_EXPIRE_MINUTES)
+    record = RefreshToken(
+        id=uuid7(),
+        user_id=user.id,
+        family_id=family_id or uuid7(),
+        expires_at=datetime.now(tz=timezone.utc) + expires_delta,
+    )
+    db.add(record)
+    await db.commit()
+    refresh_token = create_refresh_token(
+        data={"sub": str(user.id), "jti": str(record.id), "fam": str(record.family_id)},
+        expires_delta=expires_delta,
+    )
     return Token(access_token=access_token, refresh_token=refresh_token)
 
 
+async def login_for_access_token(
+    username: str,
+    password: str,
+    db: AsyncSession,
+    background_tasks: BackgroundTasks | None = None,
+):
+    user = await authenticate_user(username, password, db, background_tasks)
+    return await issue_tokens(user, db)
+
+
+async def refresh_access_token(refresh_token: str, db: AsyncSession) -> Token:
+    """Exchange a refresh token for a new access/refresh pair.
+
+    The token is consumed with a single conditional UPDATE on its primary
+    key, so two concurrent exchanges of the same token cannot both succeed.
+    If it was already used (or revoked) the token has leaked: every token in
+    its family is revoked and the client must log in again.
+    """
+    try:
+        payload = jwt.decode(refresh_token, REFRESH_SECRET_KEY, algorithms=[ALGORITHM])
+        token_id, family_id = payload["jti"], payload["fam"]
+    except (jwt.InvalidTokenError, KeyError):
+        raise REFRESH_TOKEN_EXCEPTION
+
+    now = func.now()
+    consumed = await db.scalar(
+        update(RefreshToken)
+        .where(
+            RefreshToken.id == token_id,
+            RefreshToken.used_at.is_(None),
+            RefreshToken.revoked_at.is_(None),
+            RefreshToken.expires_at > now,
+        )
+        .values(used_at=now)
+        .returning(RefreshToken.user_id)
+    )
+    if consumed is None:
+        await db.execute(
+            update(RefreshToken)
+            .where(
+                RefreshToken.family_id == family_id,
+                RefreshToken.revoked_at.is_(None),
+            )
+            .values(revoked_at=now)
+        )
+        await db.commit()
+        raise REFRESH_TOKEN_EXCEPTION
+
+    user = await db.scalar(
+        select(User)
+        .where(User.id == consumed, User.is_deleted.is_(False), User.is_active)
+        .options(joinedload(User.profile))
+    )
+    if user is None:
+        await db.commit()
+        raise REFRESH_TOKEN_EXCEPTION
+    return await issue_tokens(user, db, family_id=family_id)
+
+
 #
-def get_current_user(authorization: str = Security(oauth2_scheme)):
+async def get_current_user(authorization: str = Security(oauth2_scheme)):
     """Extract user data from JWT token provided in Authorization header."""
     if not authorization:
         raise AuthenticationError("AuthenticationError", msg="Missing or invalid token")
 
-    # Extract token
-    try:
-        payload = jwt.decode(authorization, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload  # Expected to return user info, like role and permissions
-    except JWTError:
-        raise AuthenticationError("AuthenticationError", msg="Invalid or expired token")
+    with timed("auth"):
+        payload = token_cache.get(authorization)
+        if payload is not None:
+            return payload
+
+        # Extract token
+        started = time.perf_counter()
+        try:
+            payload = jwt.decode(authorization, SECRET_KEY, algorithms=[ALGORITHM])
+            token_cache.put(authorization, payload)
+            return payload  # Expected to return user info, like role and permissions
+        except JWTError:
+            raise AuthenticationError(
+                "AuthenticationError", msg="Invalid or expired token"
+            )
+        finally:
+            JWT_DURATION.labels("decode").observe(time.perf_counter() - started)
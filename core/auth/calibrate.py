@@ -0,0 +1,53 @@
+"""Pick the bcrypt cost factor for this hardware.
+
+Usage: ``python -m core.auth.calibrate --target-ms 250``
+
+Each extra round doubles the work, so the command times ``checkpw`` at every
+cost from ``--min-rounds`` up and recommends the highest cost whose median
+verify time stays within the target. Set the result as ``BCRYPT_ROUNDS``;
+existing hashes are upgraded as their users log in.
+"""
+
+import argparse
+import statistics
+import time
+
+import bcrypt
+
+PASSWORD = b"calibration-password"
+
+
+def time_verify(rounds: int, samples: int) -> float:
+    hashed = bcrypt.hashpw(PASSWORD, bcrypt.gensalt(rounds))
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        bcrypt.checkpw(PASSWORD, hashed)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def calibrate(target_ms: float, min_rounds: int, max_rounds: int, samples: int):
+    chosen = min_rounds
+    for rounds in range(min_rounds, max_rounds + 1):
+        elapsed_ms = time_verify(rounds, samples) * 1000
+        print(f"rounds={rounds:2d}  verify={elapsed_ms:8.1f} ms")
+        if elapsed_ms > target_ms:
+            break
+        chosen = rounds
+    return chosen
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target-ms", type=float, default=250.0)
+    parser.add_argument("--min-rounds", type=int, default=10)
+    parser.add_argument("--max-rounds", type=int, default=16)
+    parser.add_argument("--samples", type=int, default=5)
+    args = parser.parse_args()
+    rounds = calibrate(args.target_ms, args.min_rounds, args.max_rounds, args.samples)
+    print(f"\nBCRYPT_ROUNDS={rounds}")
+
+
+if __name__ == "__main__":
+    main()
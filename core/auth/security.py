@@ -1,9 +1,16 @@
+import asyncio
 import datetime
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
-import bcrypt
 import jwt
 
 from config import auth_config
+from core.auth import _bcrypt_worker
+from core.exception import PASSWORD_HASHER_BUSY_EXCEPTION
+from core.metrics import Counter, Histogram
 
 # from src.lib.config import auth_config
 
@@ -14,28 +21,117 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = auth_config.access_token_expire_minutes
 REFRESH_TOKEN_EXPIRE_MINUTES = auth_config.refresh_token_expire_minutes
 
+PASSWORD_HASH_QUEUE_WAIT = Histogram(
+    "password_hash_queue_wait_seconds",
+    "Time a password operation waited for a free bcrypt worker.",
+    labelnames=("operation",),
+)
+PASSWORD_HASH_DURATION = Histogram(
+    "password_hash_duration_seconds",
+    "Time spent inside bcrypt per password operation.",
+    labelnames=("operation",),
+)
+# Signing or verifying an HS256 token takes tens of microseconds.
+JWT_DURATION = Histogram(
+    "jwt_duration_seconds",
+    "Time spent in jwt.encode / jwt.decode.",
+    labelnames=("operation",),
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.005),
+)
+PASSWORD_HASH_REJECTED = Counter(
+    "password_hash_rejected_total",
+    "Password operations rejected because the bcrypt pool was saturated.",
+    labelnames=("operation",),
+)
+
 
 class CryptContext:
-    def verify(self, plain_password: str, hashed_password: str) -> bool:
-        return bcrypt.checkpw(
-            plain_password.encode("utf-8"), hashed_password.encode("utf-8")
+    """bcrypt on a dedicated, bounded process pool.
+
+    bcrypt is CPU-bound and holds a core for ~100ms, so it runs outside the
+    event loop process entirely. At most ``max_pending`` operations may be
+    queued or running; beyond that callers get an immediate 503 instead of
+    piling up behind a login spike.
+    """
+
+    def __init__(self, workers: int, max_pending: int, rounds: int) -> None:
+        self.workers = workers
+        self.max_pending = max_pending
+        self.rounds = rounds
+        self.pending = 0
+        self._executor: ProcessPoolExecutor | None = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def _submit(self, operation: str, fn, *args):
+        if self.pending >= self.max_pending:
+            PASSWORD_HASH_REJECTED.labels(operation).inc()
+            raise PASSWORD_HASHER_BUSY_EXCEPTION
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result, waited, elapsed = await loop.run_in_executor(
+                self.executor, fn, *args, time.monotonic()
+            )
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool for the next caller.
+            self._executor = None
+            raise
+        finally:
+            self.pending -= 1
+        PASSWORD_HASH_QUEUE_WAIT.labels(operation).observe(waited)
+        PASSWORD_HASH_DURATION.labels(operation).observe(elapsed)
+        return result
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._submit(
+            "verify",
+            _bcrypt_worker.checkpw,
+            plain_password.encode("utf-8"),
+            hashed_password.encode("utf-8"),
+        )
+
+    async def hash(self, password: str) -> str:
+        hashed = await self._submit(
+            "hash", _bcrypt_worker.hashpw, password.encode("utf-8"), self.rounds
         )
+        return hashed.decode("utf-8")
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """Whether a stored ``$2b$<cost>$...`` hash uses a different cost."""
+        try:
+            return int(hashed_password.split("$")[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
 
-    def hash(self, password: str) -> str:
-        return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
 
 
-pwd_context = CryptContext()
+pwd_context = CryptContext(
+    workers=auth_config.password_hash_workers,
+    max_pending=auth_config.password_hash_max_pending,
+    rounds=auth_config.bcrypt_rounds,
+)
 
 
-def verify_password(plain_password, hashed_password):
+async def verify_password(plain_password, hashed_password):
     # if plain_password == hashed_password:
     #     return True
-    return pwd_context.verify(plain_password, hashed_password)
+    return await pwd_context.verify(plain_password, hashed_password)
 
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def get_password_hash(password):
+    return await pwd_context.hash(password)
 
 
 def create_refresh_token(
@@ -47,4 +143,7 @@ def create_refresh_token(
     to_encode = data.copy()
     expire = datetime.datetime.now(tz=datetime.timezone.utc) + expires_delta
     to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, REFRESH_SECRET_KEY, algorithm=ALGORITHM)
+    started = time.perf_counter()
+    encoded_jwt = jwt.encode(to_encode, REFRESH_SECRET_KEY, algorithm=ALGORITHM)
+    JWT_DURATION.labels("encode").observe(time.perf_counter() - started)
+    return encoded_jwt
@@ -0,0 +1,61 @@
+import hashlib
+import time
+from collections import OrderedDict
+
+from core.metrics import Counter
+
+TOKEN_CACHE_HITS = Counter(
+    "jwt_cache_hits_total", "Access tokens served from the decoded-token cache."
+)
+TOKEN_CACHE_MISSES = Counter(
+    "jwt_cache_misses_total", "Access tokens that needed a full jwt.decode."
+)
+
+
+class TokenCache:
+    """Bounded LRU of verified access-token payloads.
+
+    Entries are keyed on the SHA-256 of the whole token, signature included,
+    so only a byte-identical token that already passed verification can hit.
+    Each entry lives until the token's own ``exp``. Used from the event loop
+    only, so no locking is needed.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._entries: OrderedDict[bytes, tuple[float, dict]] = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, token: str) -> dict | None:
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            TOKEN_CACHE_MISSES.inc()
+            return None
+        expires_at, payload = entry
+        if time.time() >= expires_at:
+            del self._entries[key]
+            TOKEN_CACHE_MISSES.inc()
+            return None
+        self._entries.move_to_end(key)
+        TOKEN_CACHE_HITS.inc()
+        return payload
+
+    def put(self, token: str, payload: dict) -> None:
+        expires_at = payload.get("exp")
+        if self.max_size <= 0 or not isinstance(expires_at, (int, float)):
+            return
+        key = self._key(token)
+        self._entries[key] = (expires_at, payload)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
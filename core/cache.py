@@ -0,0 +1,132 @@
+"""Read-through cache for rarely-changing catalog responses.
+
+Entries are the final JSON bytes of a response plus its validators, so a hit
+skips both the query and Pydantic serialization. Keys live in a namespace
+(``"categories"``, ``"tags"``); writes to a table invalidate its whole
+namespace, in other workers too through :mod:`core.invalidation`.
+
+Backends implement :class:`CacheBackend` and are picked with
+``CACHE_BACKEND``; ``memory`` is a per-process TTL+LRU map and ``none``
+turns caching off. ``CACHE_TTL_SECONDS`` bounds staleness should an
+invalidation ever be missed.
+"""
+
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from typing import NamedTuple
+
+from fastapi import Request, Response
+
+from config import cache_config
+from core.conditional import Validators
+from core.metrics import Counter
+from core.serialization import dump_json
+
+CACHE_HITS = Counter("cache_hits_total", "Responses served from cache.", ["namespace"])
+CACHE_MISSES = Counter(
+    "cache_misses_total", "Responses built because of a cache miss.", ["namespace"]
+)
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    validators: Validators
+
+
+class CacheBackend:
+    async def get(self, namespace: str, key: Hashable) -> CachedResponse | None:
+        raise NotImplementedError
+
+    async def set(self, namespace: str, key: Hashable, value: CachedResponse) -> None:
+        raise NotImplementedError
+
+    async def invalidate(self, namespace: str) -> None:
+        raise NotImplementedError
+
+
+class NullCache(CacheBackend):
+    async def get(self, namespace, key):
+        return None
+
+    async def set(self, namespace, key, value):
+        pass
+
+    async def invalidate(self, namespace):
+        pass
+
+
+class MemoryCache(CacheBackend):
+    """Bounded LRU whose entries also expire ``ttl`` seconds after being set.
+
+    Used from the event loop only, so no locking is needed.
+    """
+
+    def __init__(self, ttl: float, max_entries: int) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, tuple[float, CachedResponse]] = OrderedDict()
+
+    async def get(self, namespace, key):
+        entry = self._entries.get((namespace, key))
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[(namespace, key)]
+            return None
+        self._entries.move_to_end((namespace, key))
+        return value
+
+    async def set(self, namespace, key, value):
+        self._entries[(namespace, key)] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end((namespace, key))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def invalidate(self, namespace):
+        for entry in [entry for entry in self._entries if entry[0] == namespace]:
+            del self._entries[entry]
+
+
+def build_cache(config=cache_config) -> CacheBackend:
+    if config.cache_backend == "memory":
+        return MemoryCache(config.cache_ttl_seconds, config.cache_max_entries)
+    return NullCache()
+
+
+cache = build_cache()
+
+
+async def cached_response(
+    request: Request,
+    namespace: str,
+    key: Hashable,
+    response_type,
+    load: Callable[[], Awaitable[object]],
+    validate: Callable[[], Awaitable[Validators]],
+) -> Response:
+    """Serve ``namespace``/``key`` from cache, or ``load`` and cache it.
+
+    ``response_type`` is the route's ``response_model``; what ``load``
+    returns is validated and dumped against it in one pass. The entry keeps
+    the ETag/Last-Modified from ``validate`` next to the body, so a cached
+    resource answers a conditional GET without touching the database; on a
+    miss the validators are checked before anything is loaded.
+    """
+    entry = await cache.get(namespace, key)
+    if entry is not None:
+        CACHE_HITS.labels(namespace).inc()
+        validators = entry.validators
+    else:
+        CACHE_MISSES.labels(namespace).inc()
+        validators = await validate()
+    if validators.matches(request):
+        return validators.not_modified()
+    if entry is None:
+        body = dump_json(response_type, await load())
+        entry = CachedResponse(body, validators)
+        await cache.set(namespace, key, entry)
+    return Response(
+        entry.body, media_type="application/json", headers=validators.headers
+    )
@@ -0,0 +1,341 @@
+"""Bulk catalog import through PostgreSQL COPY.
+
+Rows are read from an NDJSON or CSV stream, validated against
+``EBookImportSchema`` in chunks, COPYed into a temporary staging table and
+merged into ``ebook`` with one ``INSERT ... SELECT ... ON CONFLICT`` per
+chunk. Each chunk commits on its own, so a long import keeps what it has
+loaded if the stream is cut off. When a feed repeats an id, the last row
+with it wins, within a chunk as across chunks.
+
+Usage: ``python -m core.catalog_import books.ndjson [--format csv]``
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from typing import NamedTuple
+
+from pydantic import ValidationError
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from uuid_extensions import uuid7
+
+from core.db import get_db_context
+from models.book import Category
+from schema.book import EBookImportSchema
+
+DEFAULT_CHUNK_SIZE = 5000
+# Longest CSV record, in characters, before an open quote is taken to be
+# unterminated; well above what the schema's column lengths allow.
+MAX_CSV_RECORD = 1 << 16
+
+COLUMNS = (
+    "id",
+    "title",
+    "author",
+    "description",
+    "file_url",
+    "cover_image",
+    "category_id",
+    "is_deleted",
+    "is_active",
+)
+
+# Only the copied columns: ``LIKE ebook`` would bring along the NOT NULL of the
+# generated search_vector without its expression. ``line_no`` orders rows
+# that repeat an id.
+CREATE_STAGING = text(
+    "CREATE TEMP TABLE IF NOT EXISTS ebook_import ON COMMIT DELETE ROWS AS "
+    f"SELECT {', '.join(COLUMNS)}, 0 AS line_no FROM ebook WITH NO DATA"
+)
+
+MERGE_STAGING = text(
+    """
+    INSERT INTO ebook (id, title, author, description, file_url, cover_image,
+                       category_id, is_deleted, is_active)
+    SELECT DISTINCT ON (id) id, title, author, description, file_url,
+           cover_image, category_id, is_deleted, is_active
+    FROM ebook_import
+    ORDER BY id, line_no DESC
+    ON CONFLICT (id) DO UPDATE SET
+        title = excluded.title,
+        author = excluded.author,
+        description = excluded.description,
+        file_url = excluded.file_url,
+        cover_image = excluded.cover_image,
+        category_id = excluded.category_id,
+        updated_at = now()
+    """
+)
+
+
+class InvalidLine(NamedTuple):
+    """A line that could not be decoded; parsers report it as a row error.
+
+    ``text`` is the line with the bad bytes replaced, for parsers that need
+    its shape (e.g. the quotes of a CSV record it belongs to).
+    """
+
+    error: str
+    text: str
+
+
+def decode(line: bytes) -> str | InvalidLine:
+    try:
+        return line.decode("utf-8")
+    except UnicodeDecodeError as exc:
+        return InvalidLine(
+            f"invalid UTF-8 at byte {exc.start}", line.decode("utf-8", "replace")
+        )
+
+
+async def split_lines(
+    chunks: AsyncIterator[bytes],
+) -> AsyncIterator[str | InvalidLine]:
+    """Turn a stream of byte chunks into text lines."""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield decode(line)
+    if buffer:
+        yield decode(buffer)
+
+
+async def parse_ndjson(
+    lines: AsyncIterator[str | InvalidLine],
+) -> AsyncIterator[tuple[int, dict]]:
+    line_no = 0
+    async for line in lines:
+        line_no += 1
+        if isinstance(line, InvalidLine):
+            yield line_no, {"__error__": line.error}
+            continue
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield line_no, {"__error__": f"invalid JSON: {exc.msg}"}
+
+
+class PendingLines:
+    """Lines queued for ``csv.reader``, which asks for them one at a time.
+
+    Running dry ends the reader's iteration only until more lines are queued,
+    so one reader, and its ``line_num``, lasts the whole stream.
+    """
+
+    def __init__(self) -> None:
+        self.lines: deque[str] = deque()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+
+async def parse_csv(
+    lines: AsyncIterator[str | InvalidLine],
+) -> AsyncIterator[tuple[int, dict]]:
+    """Parse RFC 4180 CSV with a header row; empty cells are null.
+
+    A quoted field may span lines, so lines are gathered until their quotes
+    balance and the record is handed to the reader whole. Records are
+    numbered by the line they start on. A quote left open for
+    :data:`MAX_CSV_RECORD` characters, or at the end of the stream, is
+    reported as an error on its record.
+    """
+    pending = PendingLines()
+    reader = csv.reader(pending)
+
+    def read(record: list[str]) -> tuple[int, list[str]]:
+        """Parse one record; returns its first line number and its values."""
+        pending.lines.extend(record)
+        # A record with an open quote may come back in several pieces.
+        rows = list(reader)
+        return reader.line_num - len(record) + 1, rows[0] if rows else []
+
+    header = None
+    record: list[str] = []
+    size = quotes = 0
+    error = None
+    async for line in lines:
+        if isinstance(line, InvalidLine):
+            error = error or line.error
+            line = line.text
+        record.append(line + "\n")
+        size += len(line)
+        quotes += line.count('"')
+        if quotes % 2 and size < MAX_CSV_RECORD:
+            continue
+        if quotes % 2:
+            error = error or "unterminated quoted field"
+        line_no, values = read(record)
+        record, size, quotes = [], 0, 0
+        if error is not None:
+            yield line_no, {"__error__": error}
+            error = None
+        elif not any(value.strip() for value in values):
+            continue
+        elif header is None:
+            header = [name.strip() for name in values]
+        else:
+            yield line_no, {key: value or None for key, value in zip(header, values)}
+    if record:
+        line_no, _ = read(record)
+        yield line_no, {"__error__": error or "unterminated quoted field"}
+
+
+PARSERS = {"ndjson": parse_ndjson, "csv": parse_csv}
+
+
+class CatalogImporter:
+    def __init__(self, db: AsyncSession, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.db = db
+        self.chunk_size = chunk_size
+        self.category_ids: dict[str, object] = {}
+        self.known_category_ids: set = set()
+
+    async def load_categories(self) -> None:
+        """Resolve category names in memory instead of once per row."""
+        rows = await self.db.execute(
+            select(Category.name, Category.id).where(
+                Category.is_deleted.is_(False), Category.is_active
+            )
+        )
+        self.category_ids = {name: id for name, id in rows}
+        self.known_category_ids = set(self.category_ids.values())
+
+    def to_record(self, line_no: int, data: dict) -> tuple:
+        if "__error__" in data:
+            raise ValueError(data["__error__"])
+        row = EBookImportSchema.model_validate(data)
+        category_id = row.category_id
+        if category_id is None:
+            category_id = self.category_ids.get(row.category)
+            if category_id is None:
+                raise ValueError(f"unknown category {row.category!r}")
+        elif category_id not in self.known_category_ids:
+            raise ValueError(f"unknown category_id {category_id}")
+        return (
+            row.id or uuid7(),
+            row.title,
+            row.author,
+            row.description,
+            row.file_url,
+            row.cover_image,
+            category_id,
+            False,
+            True,
+            line_no,
+        )
+
+    async def load_chunk(self, records: list[tuple]) -> None:
+        await self.db.execute(CREATE_STAGING)
+        connection = await self.db.connection()
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            "ebook_import", records=records, columns=(*COLUMNS, "line_no")
+        )
+        await self.db.execute(MERGE_STAGING)
+        await self.db.commit()
+
+    async def run(self, rows: AsyncIterator[tuple[int, dict]]) -> AsyncIterator[dict]:
+        """Import ``rows`` and yield one progress report per chunk."""
+        await self.load_categories()
+        started = time.perf_counter()
+        processed = imported = failed = chunk_no = 0
+        records: list[tuple] = []
+        errors: list[dict] = []
+
+        async def flush():
+            nonlocal imported, chunk_no
+            if records:
+                await self.load_chunk(records)
+            imported += len(records)
+            chunk_no += 1
+            elapsed = time.perf_counter() - started
+            report = {
+                "chunk": chunk_no,
+                "processed": processed,
+                "imported": imported,
+                "failed": failed,
+                "rows_per_sec": round(processed / elapsed, 1) if elapsed else None,
+                "errors": list(errors),
+            }
+            records.clear()
+            errors.clear()
+            return report
+
+        async for line_no, data in rows:
+            processed += 1
+            try:
+                records.append(self.to_record(line_no, data))
+            except ValidationError as exc:
+                failed += 1
+                errors.append(
+                    {
+                        "line": line_no,
+                        "errors": exc.errors(
+                            include_url=False,
+                            include_context=False,
+                            include_input=False,
+                        ),
+                    }
+                )
+            except ValueError as exc:
+                failed += 1
+                errors.append({"line": line_no, "errors": [{"msg": str(exc)}]})
+            if len(records) + len(errors) >= self.chunk_size:
+                yield await flush()
+        report = await flush()
+        report["done"] = True
+        yield report
+
+
+async def import_catalog(
+    chunks: AsyncIterator[bytes], format: str = "ndjson", chunk_size=DEFAULT_CHUNK_SIZE
+) -> AsyncIterator[dict]:
+    """Run an import on its own session; used by the HTTP endpoint and the CLI."""
+    rows = PARSERS[format](split_lines(chunks))
+    async with get_db_context() as db:
+        async for report in CatalogImporter(db, chunk_size).run(rows):
+            yield report
+
+
+async def _read_file(path: str, block_size: int = 1 << 20) -> AsyncIterator[bytes]:
+    file = await asyncio.to_thread(open, path, "rb")
+    try:
+        while block := await asyncio.to_thread(file.read, block_size):
+            yield block
+    finally:
+        await asyncio.to_thread(file.close)
+
+
+async def _main(path: str, format: str, chunk_size: int) -> None:
+    async for report in import_catalog(_read_file(path), format, chunk_size):
+        for error in report["errors"]:
+            print(json.dumps(error, default=str))
+        print(
+            f"chunk {report['chunk']}: {report['imported']} imported, "
+            f"{report['failed']} failed, {report['rows_per_sec']} rows/s"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-load ebooks via COPY.")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=sorted(PARSERS), default=None)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+    format = args.format or ("csv" if args.path.endswith(".csv") else "ndjson")
+    asyncio.run(_main(args.path, format, args.chunk_size))
@@ -0,0 +1,104 @@
+"""Conditional GET: weak ETags and Last-Modified from row versions.
+
+A response's validator is built from the ``(key, updated_at)`` of every row
+that goes into it: the rows themselves plus the related rows its schema
+embeds. One aggregate query folds them into an md5 and a ``max(updated_at)``
+without loading anything into the ORM, so answering ``If-None-Match`` with a
+304 costs a single indexed query instead of a load and a serialization.
+
+Any write through the app bumps ``updated_at``, and a row entering or
+leaving the page changes the set of keys, so either one changes the ETag.
+That second case leaves ``max(updated_at)`` alone when the row coming in is
+older, so list pages carry no Last-Modified and only revalidate on the ETag.
+
+An empty version set means there is no current representation: nothing
+matches it, not even ``If-None-Match: *``, and a single-resource route should
+answer 404 (:attr:`Validators.found`).
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response
+from sqlalchemy import Text, cast, func, literal, literal_column, select, union_all
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def row_version(name: str, updated_at, *keys) -> tuple:
+    """Columns ``(key, updated_at)`` identifying one row of ``name``."""
+    key = literal(name)
+    for column in keys:
+        key = key + ":" + cast(column, Text)
+    return key.label("key"), updated_at.label("updated_at")
+
+
+@dataclass(frozen=True)
+class Validators:
+    etag: str
+    last_modified: datetime | None
+    # Whether any row went into the validators.
+    found: bool = True
+
+    @property
+    def headers(self) -> dict[str, str]:
+        headers = {"ETag": self.etag}
+        if self.last_modified is not None:
+            headers["Last-Modified"] = format_datetime(self.last_modified, usegmt=True)
+        return headers
+
+    def matches(self, request: Request) -> bool:
+        """Whether the client's copy is current, per RFC 9110 section 13.2.2."""
+        if not self.found:
+            return False
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            if if_none_match.strip() == "*":
+                return True
+            # If-None-Match uses the weak comparison: W/ prefixes are ignored.
+            own = self.etag.removeprefix("W/")
+            return any(
+                tag.strip().removeprefix("W/") == own
+                for tag in if_none_match.split(",")
+            )
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since and self.last_modified is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            # HTTP dates have whole seconds.
+            return self.last_modified.replace(microsecond=0) <= since
+        return False
+
+    def not_modified(self) -> Response:
+        return Response(status_code=304, headers=self.headers)
+
+
+async def compute_validators(
+    db: AsyncSession, *parts, last_modified: bool = True
+) -> Validators:
+    """Validators over the union of ``parts``, each selecting ``row_version``s.
+
+    Pass ``last_modified=False`` for list pages (see the module docstring).
+    """
+    versions = union_all(*parts).subquery()
+    digest, modified = (
+        await db.execute(
+            select(
+                func.md5(
+                    func.string_agg(
+                        versions.c.key + "@" + cast(versions.c.updated_at, Text),
+                        aggregate_order_by(literal_column("','"), versions.c.key),
+                    )
+                ),
+                func.max(versions.c.updated_at),
+            )
+        )
+    ).one()
+    return Validators(
+        f'W/"{digest or "empty"}"',
+        modified if last_modified else None,
+        found=digest is not None,
+    )
@@ -1,40 +1,123 @@
-from contextlib import contextmanager
+from contextlib import asynccontextmanager
+from uuid import UUID
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from fastapi import Request
+from sqlalchemy import Uuid, any_, literal, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 
 from config import db_config
+from core.db.pool import InstrumentedAsyncPool, instrument_pool
+from core.db.replicas import SAFE_METHODS, ReplicaSet, client_key
+from core.profiling import profile_queries
+
+
+def get_async_database_url(url: str) -> str:
+    """Point the configured DSN at the asyncpg driver."""
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url.removeprefix(prefix)
+    return url
+
+
+def build_engine(url: str, pool_size: int, name: str) -> AsyncEngine:
+    engine = create_async_engine(
+        get_async_database_url(url),
+        pool_size=pool_size,
+        max_overflow=db_config.max_overflow,
+        pool_timeout=db_config.pool_timeout,
+        pool_recycle=db_config.pool_recycle,
+        pool_pre_ping=db_config.pool_pre_ping,
+        poolclass=InstrumentedAsyncPool,
+    )
+    instrument_pool(engine, name)
+    profile_queries(engine)
+    return engine
 
-engine = create_engine(
-    db_config.database_url.unicode_string(),
-    pool_size=db_config.pool_size,
-    max_overflow=db_config.max_overflow,
-    pool_timeout=db_config.pool_timeout,
-    pool_recycle=db_config.pool_recycle,
-    pool_pre_ping=db_config.pool_pre_ping,
+
+engine = build_engine(
+    db_config.database_url.unicode_string(), db_config.pool_size, "primary"
+)
+replicas = ReplicaSet(
+    {
+        f"replica-{number}": build_engine(
+            url.unicode_string(), db_config.replica_pool_size, f"replica-{number}"
+        )
+        for number, url in enumerate(db_config.replica_database_url)
+    },
+    pin_seconds=db_config.read_your_writes_seconds,
+    check_interval=db_config.replica_health_interval,
+    max_lag=db_config.replica_max_lag_seconds,
 )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Objects are handed to response serialization after commit, so they must not
+# be expired (an expired attribute would need a lazy load outside the greenlet).
+SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
 
 
-@contextmanager
-def get_db_context():
+@asynccontextmanager
+async def get_db_context():
     session = SessionLocal()
     try:
         yield session
     except Exception:
-        session.rollback()
+        await session.rollback()
         raise
     finally:
-        session.close()
+        await session.close()
 
 
-def get_db():
+async def get_db(request: Request):
+    if request.method not in SAFE_METHODS:
+        # May write: read from the primary for a while (core/db/replicas.py).
+        replicas.pin(client_key(request))
     session = SessionLocal()
     try:
         yield session
     except Exception:
-        session.rollback()
+        await session.rollback()
+        raise
+    finally:
+        await session.close()
+
+
+async def get_read_db(request: Request):
+    """Session for read-only routes: a replica when one is configured and fit."""
+    replica = replicas.pick(client_key(request))
+    session = SessionLocal() if replica is None else replica.sessionmaker()
+    try:
+        yield session
+    except Exception as exc:
+        await session.rollback()
+        if replica is not None:
+            replica.failed(exc)
         raise
     finally:
-        session.close()
+        await session.close()
+
+
+def uuid_array(ids):
+    """Bind a list of ids as one ``uuid[]`` parameter.
+
+    ``col == any_(uuid_array(ids))`` and ``unnest(uuid_array(ids))`` keep a
+    statement at one parameter however many ids there are, where ``IN`` would
+    hit the driver's 32767-parameter limit.
+    """
+    return literal(list(ids), ARRAY(Uuid))
+
+
+async def missing_ids(db: AsyncSession, model, ids) -> set[UUID]:
+    """The subset of ``ids`` with no live ``model`` row, in one query."""
+    found = await db.scalars(
+        select(model.id).where(
+            model.id == any_(uuid_array(ids)),
+            model.is_deleted.is_(False),
+            model.is_active,
+        )
+    )
+    return set(ids) - set(found)
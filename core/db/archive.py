@@ -0,0 +1,317 @@
+"""Move long soft-deleted rows out of the hot tables.
+
+Usage: ``python -m core.db.archive run``
+       ``python -m core.db.archive restore <table> <id>... [--undelete]``
+
+Rows of the tables in :data:`models.archive.ARCHIVE_ROOTS` that were
+soft-deleted more than ``ARCHIVE_AFTER_DAYS`` ago move to their
+``<table>_archive`` table, together with every row that references them (a
+deleted user takes its profile, bookmarks, sessions, notes and refresh tokens
+along). The foreign keys to follow come from the model metadata.
+
+Work is done in batches of ``ARCHIVE_BATCH_SIZE`` roots. Each batch is one
+transaction that locks its roots with ``SKIP LOCKED`` and moves them with
+``DELETE ... RETURNING`` feeding an ``INSERT``, children first. The archiver
+pauses ``ARCHIVE_PAUSE_SECONDS`` between batches and gives up on a batch
+rather than wait on locks. A batch either moves completely or not at all,
+so an interrupted run needs no bookkeeping; the next run carries on where
+it stopped. Only one worker archives at a time.
+
+Each run also deletes expired refresh tokens, in batches of the same size:
+every login and refresh inserts one, and once expired they can never be
+exchanged again.
+
+With ``ARCHIVE_INTERVAL_SECONDS`` set the app runs the archiver on that
+schedule; otherwise run it from cron with the command above.
+
+:func:`restore` moves archived rows and their archived dependants back,
+optionally un-deleting the roots.
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+
+from sqlalchemy import Table, any_, delete, func, insert, select, text, update
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import db_config
+from core.db import get_db_context, uuid_array
+from core.metrics import Counter
+from models import Base
+from models.archive import ARCHIVE_ROOTS, ARCHIVES, referencing
+from models.user import RefreshToken
+
+logger = logging.getLogger(__name__)
+
+# pg_try_advisory_xact_lock key held by the batch in progress.
+ARCHIVE_LOCK = 0x61726368
+# A batch waiting this long for a row or table lock is abandoned and retried.
+LOCK_TIMEOUT = "2s"
+# Key under which runs report expired refresh tokens deleted.
+EXPIRED_TOKENS = "refreshtoken (expired)"
+
+ARCHIVED_ROWS = Counter(
+    "db_archived_rows_total", "Rows moved to archive tables.", ("table",)
+)
+RESTORED_ROWS = Counter(
+    "db_restored_rows_total", "Rows moved back from archive tables.", ("table",)
+)
+PURGED_ROWS = Counter(
+    "db_purged_rows_total", "Expired rows deleted outright.", ("table",)
+)
+
+
+def move(source: Table, target: Table, where) -> object:
+    """``WITH moved AS (DELETE FROM source ... RETURNING) INSERT INTO target``."""
+    names = [column.name for column in target.columns if column.name in source.columns]
+    moved = (
+        delete(source)
+        .where(where)
+        .returning(*(source.c[name] for name in names))
+        .cte("moved")
+    )
+    return insert(target).from_select(names, select(moved)).add_cte(moved)
+
+
+def archive_statements(table: Table, where) -> list[tuple[str, object]]:
+    """Statements archiving ``table`` rows matching ``where``, dependants first."""
+    statements = []
+    for child, foreign_key in referencing(table):
+        under = foreign_key.parent.in_(select(foreign_key.column).where(where))
+        statements += archive_statements(child, under)
+    statements.append((table.name, move(table, ARCHIVES[table.name], where)))
+    return statements
+
+
+def restore_statements(table: Table, match) -> list[tuple[str, object]]:
+    """Statements restoring archived ``table`` rows, then their dependants.
+
+    ``match(t)`` is the condition on ``table`` or its archive picking the
+    rows to restore. Each level is moved back before the level below looks
+    for rows referencing it, so dependants are found through the live table.
+    """
+    archive = ARCHIVES[table.name]
+    statements = [(table.name, move(archive, table, match(archive)))]
+    for child, foreign_key in referencing(table):
+
+        def under(t, foreign_key=foreign_key):
+            parents = select(foreign_key.column).where(match(table))
+            return t.c[foreign_key.parent.name].in_(parents)
+
+        statements += restore_statements(child, under)
+    return statements
+
+
+async def archive_batch(db: AsyncSession, table: Table, cutoff: datetime, size: int):
+    """Archive one batch of ``table`` roots; ``None`` if another worker is busy."""
+    if not await db.scalar(select(func.pg_try_advisory_xact_lock(ARCHIVE_LOCK))):
+        return None
+    await db.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+    ids = (
+        await db.scalars(
+            select(table.c.id)
+            .where(table.c.is_deleted.is_(True), table.c.deleted_at < cutoff)
+            .order_by(table.c.deleted_at, table.c.id)
+            .limit(size)
+            .with_for_update(skip_locked=True)
+        )
+    ).all()
+    moved = {}
+    if ids:
+        statements = archive_statements(table, table.c.id == any_(uuid_array(ids)))
+        for name, statement in statements:
+            moved[name] = (await db.execute(statement)).rowcount
+    await db.commit()
+    for name, count in moved.items():
+        ARCHIVED_ROWS.labels(name).inc(count)
+    return moved
+
+
+async def purge_batch(db: AsyncSession, size: int):
+    """Delete one batch of expired refresh tokens; ``None`` if another worker is busy."""
+    if not await db.scalar(select(func.pg_try_advisory_xact_lock(ARCHIVE_LOCK))):
+        return None
+    await db.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+    expired = (
+        select(RefreshToken.id)
+        .where(RefreshToken.expires_at < func.now())
+        .limit(size)
+        .with_for_update(skip_locked=True)
+    )
+    deleted = (
+        await db.execute(delete(RefreshToken).where(RefreshToken.id.in_(expired)))
+    ).rowcount
+    await db.commit()
+    PURGED_ROWS.labels(RefreshToken.__tablename__).inc(deleted)
+    return {EXPIRED_TOKENS: deleted}
+
+
+class Archiver:
+    """Archives due rows every ``interval`` seconds until stopped."""
+
+    def __init__(
+        self, after_days: int, batch_size: int, pause: float, interval: float
+    ) -> None:
+        self.after = timedelta(days=after_days)
+        self.batch_size = batch_size
+        self.pause = pause
+        self.interval = interval
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    async def _sleep(self, seconds: float) -> None:
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), seconds)
+        except TimeoutError:
+            pass
+
+    async def _drain(self, name: str, batch, totals: dict[str, int]) -> bool:
+        """Run ``batch(db)`` until it comes back short of a full ``name`` batch.
+
+        Adds the rows it reports to ``totals``. False if another worker holds
+        the lock, in which case the round should be skipped.
+        """
+        while not self._stopping:
+            try:
+                async with get_db_context() as db:
+                    moved = await batch(db)
+            except DBAPIError as exc:
+                # Most likely lock_timeout; back off and try again.
+                logger.warning("Archive batch of %s failed: %s", name, exc)
+                await self._sleep(self.pause or 1.0)
+                continue
+            if moved is None:
+                logger.info("Another worker is archiving; skipping this round")
+                return False
+            for table, count in moved.items():
+                totals[table] = totals.get(table, 0) + count
+            if moved.get(name, 0) < self.batch_size:
+                break
+            await self._sleep(self.pause)
+        return True
+
+    async def run_once(self) -> dict[str, int]:
+        """Archive everything currently due and delete expired refresh tokens.
+
+        Returns rows moved, or deleted, per table.
+        """
+        cutoff = datetime.now(tz=timezone.utc) - self.after
+        totals: dict[str, int] = {}
+        for root in ARCHIVE_ROOTS:
+            table = Base.metadata.tables[root]
+
+            def batch(db, table=table):
+                return archive_batch(db, table, cutoff, self.batch_size)
+
+            if not await self._drain(root, batch, totals):
+                return totals
+        await self._drain(
+            EXPIRED_TOKENS, lambda db: purge_batch(db, self.batch_size), totals
+        )
+        return totals
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                totals = await self.run_once()
+                if totals:
+                    logger.info("Archived %s", totals)
+            except Exception:
+                logger.exception("Archiving failed; will retry")
+            await self._sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop between batches; a batch in progress is left to commit."""
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+
+
+archiver = (
+    Archiver(
+        db_config.archive_after_days,
+        db_config.archive_batch_size,
+        db_config.archive_pause_seconds,
+        db_config.archive_interval_seconds,
+    )
+    if db_config.archive_interval_seconds
+    else None
+)
+
+
+async def restore(
+    db: AsyncSession, table_name: str, ids: list[UUID], undelete: bool = False
+) -> dict[str, int]:
+    """Move archived ``table_name`` rows and their archived dependants back.
+
+    Restored rows keep their soft-deleted state unless ``undelete`` is set,
+    which reactivates the ``ids`` themselves. Raises ``IntegrityError`` (and
+    restores nothing) if a row clashes with live data, e.g. an email that has
+    been registered again since.
+    """
+    if table_name not in ARCHIVE_ROOTS:
+        raise ValueError(f"{table_name} is not archived; one of {ARCHIVE_ROOTS}")
+    table = Base.metadata.tables[table_name]
+    restored = {}
+    statements = restore_statements(table, lambda t: t.c.id == any_(uuid_array(ids)))
+    for name, statement in statements:
+        restored[name] = (await db.execute(statement)).rowcount
+    if undelete:
+        await db.execute(
+            update(table)
+            .where(table.c.id == any_(uuid_array(ids)))
+            .values(is_deleted=False, is_active=True, deleted_at=None)
+        )
+    await db.commit()
+    for name, count in restored.items():
+        RESTORED_ROWS.labels(name).inc(count)
+    return restored
+
+
+async def _run_cli(args) -> dict[str, int]:
+    if args.command == "run":
+        return await Archiver(
+            db_config.archive_after_days,
+            db_config.archive_batch_size,
+            db_config.archive_pause_seconds,
+            0,
+        ).run_once()
+    async with get_db_context() as db:
+        return await restore(db, args.table, args.ids, args.undelete)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser(
+        "run", help="archive everything due, purge expired tokens, then exit"
+    )
+    restore_parser = commands.add_parser("restore", help="bring archived rows back")
+    restore_parser.add_argument("table", choices=ARCHIVE_ROOTS)
+    restore_parser.add_argument("ids", type=UUID, nargs="+")
+    restore_parser.add_argument("--undelete", action="store_true")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    counts = asyncio.run(_run_cli(args))
+    for table, count in counts.items():
+        print(f"{table:>20} {count:>10}")
+    verb = "Archived or purged" if args.command == "run" else "Restored"
+    print(f"{verb} {sum(counts.values())} rows in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
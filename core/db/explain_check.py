@@ -0,0 +1,151 @@
+"""Check that the hot route queries are served by an index.
+
+Usage: ``python -m core.db.explain_check``
+
+Each query below is one a route issues, built with the route's own query
+builder where it has one. It is run through ``EXPLAIN (FORMAT JSON)``
+against ``DATABASE_URL`` and the plan must read its table through the index
+named next to it. Sequential scans are disabled for the check, so it still
+answers "can an index serve this?" on a near-empty dev database where the
+planner would otherwise scan anyway. Exits non-zero on failure.
+"""
+
+import asyncio
+import json
+import sys
+from uuid import UUID
+
+from sqlalchemy import func, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.db import get_db_context
+from core.db.loading import load_plan
+from models.book import Bookmark, Category, EBook, Note
+from models.user import User, UserReadingSession
+from routers.book import bookmarked_ebooks_query
+from schema.book import CategoryResponse
+
+INDEX_SCANS = {"Index Scan", "Index Only Scan", "Bitmap Index Scan"}
+
+SAMPLE_ID = UUID(int=1)
+
+
+def live(model):
+    return (model.is_deleted.is_(False), model.is_active)
+
+
+def hot_queries() -> dict[str, tuple[str, object]]:
+    """``name -> (expected index, statement)`` for every query checked."""
+    return {
+        "Base.get (ebook by id)": (
+            "ix_ebook_live_id",
+            select(EBook.id).where(EBook.id == SAMPLE_ID, *live(EBook)),
+        ),
+        "Base.paginate (ebooks)": (
+            "ix_ebook_live_id",
+            select(EBook.id)
+            .where(EBook.id > SAMPLE_ID, *live(EBook))
+            .order_by(EBook.id)
+            .limit(51),
+        ),
+        "Base.paginate (categories)": (
+            "ix_category_live_id",
+            select(Category.id).where(*live(Category)).order_by(Category.id).limit(51),
+        ),
+        "Base.paginate (users)": (
+            "ix_user_live_id",
+            select(User.id).where(*live(User)).order_by(User.id).limit(51),
+        ),
+        "GET /categories?id": (
+            "ix_category_live_id",
+            Category.get_query(SAMPLE_ID, load_plan(Category, CategoryResponse)),
+        ),
+        "GET /ebooks/search": (
+            "ix_ebook_search_vector",
+            select(EBook.id).where(
+                EBook.search_vector.op("@@")(func.to_tsquery("english", "dune:*"))
+            ),
+        ),
+        "GET /ebooks (bookmarks of a page)": (
+            "ix_bookmark_ebook_id",
+            select(Bookmark.id).where(Bookmark.ebook_id.in_([SAMPLE_ID])),
+        ),
+        "GET /user/bookmarks": (
+            "uq_bookmark_user_ebook_page",
+            bookmarked_ebooks_query(SAMPLE_ID),
+        ),
+        "GET /user/notes/{ebook_id}": (
+            "ix_note_user_ebook_page",
+            select(Note.id)
+            .where(Note.user_id == SAMPLE_ID, Note.ebook_id == SAMPLE_ID)
+            .order_by(Note.page_number, Note.id)
+            .limit(51),
+        ),
+        "GET /user/notes/search": (
+            "ix_note_search_vector",
+            select(Note.id).where(
+                Note.search_vector.op("@@")(func.to_tsquery("english", "dune:*"))
+            ),
+        ),
+        "GET /user/sync (notes)": (
+            "ix_note_user_updated",
+            select(Note.id)
+            .where(
+                Note.user_id == SAMPLE_ID,
+                tuple_(Note.updated_at, Note.id) > tuple_(func.now(), SAMPLE_ID),
+            )
+            .order_by(Note.updated_at, Note.id)
+            .limit(501),
+        ),
+        "POST /user/reading-sessions/{ebook_id} (duplicate)": (
+            "uq_userreadingsession_user_ebook",
+            select(UserReadingSession.id).where(
+                UserReadingSession.user_id == SAMPLE_ID,
+                UserReadingSession.ebook_id == SAMPLE_ID,
+            ),
+        ),
+    }
+
+
+def index_scans(plan: dict) -> list[str]:
+    """Names of every index ``plan`` scans."""
+    found = [plan["Index Name"]] if plan.get("Node Type") in INDEX_SCANS else []
+    for child in plan.get("Plans", ()):
+        found.extend(index_scans(child))
+    return found
+
+
+async def explain(db: AsyncSession, statement) -> dict:
+    """Plan ``statement`` exactly as the app sends it: same SQL, bound params."""
+    connection = await db.connection()
+    compiled = statement.compile(
+        dialect=connection.dialect, compile_kwargs={"render_postcompile": True}
+    )
+    params = [compiled.params[name] for name in compiled.positiontup]
+    raw = await connection.get_raw_connection()
+    plan = await raw.driver_connection.fetchval(
+        f"EXPLAIN (FORMAT JSON) {compiled}", *params
+    )
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+async def check() -> bool:
+    ok = True
+    async with get_db_context() as db:
+        await db.execute(text("SET LOCAL enable_seqscan = off"))
+        for name, (index, statement) in hot_queries().items():
+            indexes = index_scans(await explain(db, statement))
+            if index in indexes:
+                print(f"ok    {name}: {index}")
+            else:
+                ok = False
+                used = ", ".join(indexes) or "no index"
+                print(f"FAIL  {name}: expected {index}, plan uses {used}")
+        await db.rollback()
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(check()) else 1)
@@ -0,0 +1,55 @@
+from functools import lru_cache
+from types import UnionType
+from typing import Union, get_args, get_origin
+
+from pydantic import BaseModel
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, raiseload, selectinload
+
+
+def _nested_schema(annotation) -> type[BaseModel] | None:
+    """Find the schema inside ``X``, ``list[X]`` or ``X | None``."""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    if get_origin(annotation) in (list, tuple, set, Union, UnionType):
+        for arg in get_args(annotation):
+            schema = _nested_schema(arg)
+            if schema is not None:
+                return schema
+    return None
+
+
+def _relationship_options(model, schema: type[BaseModel], exclude=()) -> list:
+    relationships = inspect(model).relationships
+    options = []
+    for name, field in schema.model_fields.items():
+        relationship = relationships.get(name)
+        if relationship is None or name in exclude:
+            continue
+        attribute = getattr(model, name)
+        # Collections get their own SELECT ... IN so the parent rows are not
+        # multiplied; many-to-one rows ride along on the parent query.
+        loader = (
+            selectinload(attribute) if relationship.uselist else joinedload(attribute)
+        )
+        nested = _nested_schema(field.annotation)
+        if nested is not None:
+            loader = loader.options(
+                *_relationship_options(relationship.mapper.class_, nested)
+            )
+        options.append(loader)
+    options.append(raiseload("*"))
+    return options
+
+
+@lru_cache
+def load_plan(model, schema: type[BaseModel], exclude: tuple[str, ...] = ()) -> tuple:
+    """Loader options matching exactly what ``schema`` serializes from ``model``.
+
+    Every relationship the schema reads is eagerly loaded (recursively for
+    nested schemas) and every other relationship is set to ``raiseload`` so
+    an accidental lazy load fails loudly instead of issuing N extra queries.
+    Top-level relationships named in ``exclude`` are left to the caller, e.g.
+    for a ``contains_eager`` over a filtered join.
+    """
+    return tuple(_relationship_options(model, schema, exclude))
@@ -0,0 +1,135 @@
+"""Connection pool instrumentation.
+
+``InstrumentedAsyncPool`` times every checkout (the wait for a free
+connection, plus connecting when the pool grows) and counts timeouts.
+:func:`instrument_pool` adds scrape-time gauges for pool occupancy and times
+the ``pool_pre_ping`` round trip. Every series is labelled with the pool's
+name (``primary``, or a replica's). Checkout and ping are timed with two
+``perf_counter`` calls and one histogram observe each; the gauges cost
+nothing until ``/metrics`` is read.
+"""
+
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from core.metrics import Counter, Gauge, Histogram
+
+# Checkouts from a warm pool take microseconds; a saturated one, seconds.
+POOL_BUCKETS = (
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.5,
+    1.0,
+    5.0,
+    30.0,
+)
+
+POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time to obtain a connection from the pool, including any new connect.",
+    labelnames=("pool",),
+    buckets=POOL_BUCKETS,
+)
+POOL_CHECKOUT_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts_total",
+    "Checkouts that gave up after pool_timeout.",
+    labelnames=("pool",),
+)
+POOL_PRE_PING = Histogram(
+    "db_pool_pre_ping_seconds",
+    "Round trip of the pool_pre_ping liveness check on checkout.",
+    labelnames=("pool",),
+    buckets=POOL_BUCKETS,
+)
+POOL_CONNECTS = Counter(
+    "db_pool_connections_created_total",
+    "New DBAPI connections opened by the pool.",
+    labelnames=("pool",),
+)
+POOL_INVALIDATIONS = Counter(
+    "db_pool_invalidations_total",
+    "Connections discarded as broken (including failed pre-pings).",
+    labelnames=("pool",),
+)
+POOL_SIZE = Gauge(
+    "db_pool_size", "Configured number of persistent connections.", ("pool",)
+)
+POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "Connections currently checked out.", ("pool",)
+)
+POOL_CHECKED_IN = Gauge(
+    "db_pool_checked_in", "Idle connections in the pool.", ("pool",)
+)
+POOL_OVERFLOW = Gauge(
+    "db_pool_overflow",
+    "Connections open beyond pool_size (negative while the pool is warming).",
+    ("pool",),
+)
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    # Labelled children, set by instrument_pool.
+    checkout_wait = None
+    checkout_timeouts = None
+
+    def _do_get(self):
+        if self.checkout_wait is None:
+            return super()._do_get()
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.checkout_timeouts.inc()
+            raise
+        finally:
+            self.checkout_wait.observe(time.perf_counter() - started)
+
+    def recreate(self):
+        # engine.dispose() swaps in a new pool; it keeps reporting as this one.
+        pool = super().recreate()
+        pool.checkout_wait = self.checkout_wait
+        pool.checkout_timeouts = self.checkout_timeouts
+        return pool
+
+
+def instrument_pool(engine: AsyncEngine, name: str = "primary") -> None:
+    """Report ``engine``'s pool under ``pool="<name>"``."""
+    sync_engine = engine.sync_engine
+    if isinstance(sync_engine.pool, InstrumentedAsyncPool):
+        sync_engine.pool.checkout_wait = POOL_CHECKOUT_WAIT.labels(name)
+        sync_engine.pool.checkout_timeouts = POOL_CHECKOUT_TIMEOUTS.labels(name)
+    # Read through the engine, which may have replaced its pool since.
+    POOL_SIZE.labels(name).function = lambda: sync_engine.pool.size()
+    POOL_CHECKED_OUT.labels(name).function = lambda: sync_engine.pool.checkedout()
+    POOL_CHECKED_IN.labels(name).function = lambda: sync_engine.pool.checkedin()
+    POOL_OVERFLOW.labels(name).function = lambda: sync_engine.pool.overflow()
+
+    connects = POOL_CONNECTS.labels(name)
+    invalidations = POOL_INVALIDATIONS.labels(name)
+    event.listen(sync_engine, "connect", lambda *_: connects.inc())
+    event.listen(sync_engine, "invalidate", lambda *_: invalidations.inc())
+
+    dialect = sync_engine.dialect
+    do_ping = dialect.do_ping
+    pre_ping = POOL_PRE_PING.labels(name)
+
+    def timed_ping(dbapi_connection):
+        started = time.perf_counter()
+        try:
+            return do_ping(dbapi_connection)
+        finally:
+            pre_ping.observe(time.perf_counter() - started)
+
+    dialect.do_ping = timed_ping
@@ -0,0 +1,211 @@
+"""Read replicas for read-only routes.
+
+With ``REPLICA_DATABASE_URL`` set, :func:`core.db.get_read_db` hands each
+request a session on the next healthy replica, round-robin, and falls back to
+the primary when none is healthy. Each replica has its own pool.
+
+A background task checks every replica each ``REPLICA_HEALTH_INTERVAL``
+seconds. A replica is taken out of rotation when it cannot be reached, or
+when its replay lag exceeds ``REPLICA_MAX_LAG_SECONDS``, and put back once it
+passes again. A replica that has not passed a check yet is not used.
+
+Read-your-writes: a request that may write (any method but GET, HEAD or
+OPTIONS through ``get_db``) pins its client to the primary for
+``READ_YOUR_WRITES_SECONDS``. The pin starts before the write, so it cannot
+lose a race with the client's next read. Clients are told apart by their
+``Authorization`` header, or else their address. Pins are per process;
+behind several workers they hold when a client's requests stick to one
+worker, and otherwise bound how stale a read can be rather than rule it out.
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+from collections import deque
+
+import asyncpg
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+from core.metrics import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+# Expired pins are swept once this many are held.
+PIN_SWEEP_SIZE = 10_000
+
+# WAL positions, in bytes, received and replayed; NULL on a server that is
+# not a standby.
+WAL_POSITIONS = (
+    "SELECT pg_last_wal_receive_lsn() - '0/0'::pg_lsn, "
+    "pg_last_wal_replay_lsn() - '0/0'::pg_lsn"
+)
+# Checks remembered per replica to date unreplayed WAL.
+LAG_HISTORY = 1000
+
+REPLICA_HEALTHY = Gauge(
+    "db_replica_healthy", "1 while a replica is in rotation.", ("replica",)
+)
+REPLICA_LAG = Gauge(
+    "db_replica_lag_seconds", "Replay lag at the last health check.", ("replica",)
+)
+READ_SESSIONS = Counter(
+    "db_read_sessions_total",
+    "Sessions handed to read-only routes, by where they went.",
+    ("target",),
+)
+
+
+def client_key(request) -> str:
+    authorization = request.headers.get("authorization")
+    if authorization:
+        return authorization
+    return request.client.host if request.client else ""
+
+
+class Replica:
+    def __init__(self, name: str, engine: AsyncEngine) -> None:
+        self.name = name
+        self.engine = engine
+        self.sessionmaker = async_sessionmaker(
+            bind=engine, autoflush=False, expire_on_commit=False
+        )
+        # Same server and credentials as the pool, as the dialect hands them
+        # to asyncpg; checks use their own connection, outside the pool.
+        self.connect_kwargs = engine.dialect.create_connect_args(engine.url)[1]
+        self.healthy = False
+        self.lag: float | None = None
+        # (checked at, WAL received by then), oldest first, not yet replayed
+        self._received: deque[tuple[float, int]] = deque(maxlen=LAG_HISTORY)
+
+    def replay_lag(self, received: int, replayed: int) -> float:
+        """Seconds since the oldest check that saw WAL which is still unreplayed.
+
+        The time since the last replayed transaction would count an idle
+        spell as lag; this measures at the resolution of the check interval.
+        """
+        now = time.monotonic()
+        while self._received and self._received[0][1] <= replayed:
+            self._received.popleft()
+        if received > replayed:
+            self._received.append((now, received))
+        return now - self._received[0][0] if self._received else 0.0
+
+    def mark(self, healthy: bool, lag: float | None = None) -> None:
+        if healthy != self.healthy:
+            logger.warning(
+                "Replica %s %s rotation",
+                self.name,
+                "back in" if healthy else "taken out of",
+            )
+        self.healthy = healthy
+        self.lag = lag
+        REPLICA_HEALTHY.labels(self.name).set(int(healthy))
+        REPLICA_LAG.labels(self.name).set(lag or 0.0)
+
+    def failed(self, exc: Exception) -> None:
+        """Take a replica out at once when a request lost its connection."""
+        if isinstance(exc, DBAPIError) and exc.connection_invalidated:
+            self.mark(False)
+
+
+class ReplicaSet:
+    def __init__(
+        self,
+        engines: dict[str, AsyncEngine],
+        pin_seconds: float,
+        check_interval: float,
+        max_lag: float,
+    ) -> None:
+        self.replicas = [Replica(name, engine) for name, engine in engines.items()]
+        self.pin_seconds = pin_seconds
+        self.check_interval = check_interval
+        self.max_lag = max_lag
+        self._rotation = itertools.cycle(self.replicas)
+        self._pins: dict[str, float] = {}
+        self._task: asyncio.Task | None = None
+
+    def pick(self, key: str) -> Replica | None:
+        """The replica to read from, or None to read from the primary."""
+        if not self.replicas:
+            return None
+        if self.pinned(key):
+            READ_SESSIONS.labels("pinned").inc()
+            return None
+        for _ in range(len(self.replicas)):
+            replica = next(self._rotation)
+            if replica.healthy:
+                READ_SESSIONS.labels("replica").inc()
+                return replica
+        READ_SESSIONS.labels("primary").inc()
+        return None
+
+    def pin(self, key: str) -> None:
+        if not self.replicas or not self.pin_seconds:
+            return
+        now = time.monotonic()
+        self._pins[key] = now + self.pin_seconds
+        if len(self._pins) >= PIN_SWEEP_SIZE:
+            self._pins = {k: until for k, until in self._pins.items() if until > now}
+
+    def pinned(self, key: str) -> bool:
+        until = self._pins.get(key)
+        if until is None:
+            return False
+        if until <= time.monotonic():
+            del self._pins[key]
+            return False
+        return True
+
+    async def _lag(self, replica: Replica) -> float | None:
+        connection = await asyncpg.connect(
+            **replica.connect_kwargs, timeout=self.check_interval
+        )
+        try:
+            received, replayed = await connection.fetchrow(
+                WAL_POSITIONS, timeout=self.check_interval
+            )
+        finally:
+            await connection.close()
+        if received is None or replayed is None:
+            return None
+        return replica.replay_lag(int(received), int(replayed))
+
+    async def check(self, replica: Replica) -> None:
+        try:
+            lag = await self._lag(replica)
+        except (
+            OSError,
+            TimeoutError,
+            asyncpg.PostgresError,
+            asyncpg.InterfaceError,
+        ) as exc:
+            if replica.healthy:
+                logger.warning(
+                    "Replica %s failed its health check: %s", replica.name, exc
+                )
+            replica.mark(False)
+            return
+        replica.mark(lag is None or lag <= self.max_lag, lag)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.gather(*(self.check(replica) for replica in self.replicas))
+            await asyncio.sleep(self.check_interval)
+
+    def start(self) -> None:
+        if self.replicas and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
@@ -0,0 +1,155 @@
+"""Write-behind buffering for reading progress.
+
+Reader apps send ``PUT /user/reading-sessions/{id}`` on every page turn. With
+``READING_PROGRESS_WRITE_BEHIND`` enabled the route hands the new page to
+:data:`reading_progress` and answers straight away; only the latest page per
+session is kept, and a background task writes everything pending in one
+``UPDATE ... FROM (VALUES ...)`` at most ``READING_PROGRESS_MAX_STALENESS``
+seconds later (sooner once ``READING_PROGRESS_MAX_PENDING`` sessions are
+waiting). The app lifespan flushes whatever is left on shutdown.
+
+Pending pages live in this process only: a crash loses at most one staleness
+window of progress, and another worker serves the stored page until then.
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict
+from uuid import UUID
+
+from sqlalchemy import Integer, Uuid, column, func, select, update, values
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import db_config
+from core.db import get_db_context
+from models.user import UserReadingSession
+
+logger = logging.getLogger(__name__)
+
+# Rows per UPDATE; two parameters each keeps well under asyncpg's 32767.
+FLUSH_BATCH_SIZE = 5000
+OWNER_CACHE_SIZE = 100_000
+
+
+class ReadingProgressBuffer:
+    def __init__(self, max_staleness: float, max_pending: int) -> None:
+        self.max_staleness = max_staleness
+        self.max_pending = max_pending
+        self._pending: dict[UUID, int] = {}
+        # session id -> (user id, ebook id); sessions never change owner, so a
+        # page turn on a known session needs no query at all.
+        self._owners: OrderedDict[UUID, tuple[UUID, UUID]] = OrderedDict()
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+
+    async def owner(
+        self, db: AsyncSession, session_id: UUID
+    ) -> tuple[UUID, UUID] | None:
+        """``(user_id, ebook_id)`` of a live session, or None."""
+        owner = self._owners.get(session_id)
+        if owner is not None:
+            self._owners.move_to_end(session_id)
+            return owner
+        row = (
+            await db.execute(
+                select(UserReadingSession.user_id, UserReadingSession.ebook_id).where(
+                    UserReadingSession.id == session_id,
+                    UserReadingSession.is_deleted.is_(False),
+                    UserReadingSession.is_active,
+                )
+            )
+        ).first()
+        if row is None:
+            return None
+        self._owners[session_id] = owner = tuple(row)
+        while len(self._owners) > OWNER_CACHE_SIZE:
+            self._owners.popitem(last=False)
+        return owner
+
+    def record(self, session_id: UUID, last_page: int) -> None:
+        self._pending[session_id] = last_page
+        if len(self._pending) >= self.max_pending:
+            self._wakeup.set()
+
+    def latest(self, session_id: UUID, stored: int) -> int:
+        """The page a reader will see once pending writes land."""
+        return self._pending.get(session_id, stored)
+
+    async def flush(self) -> int:
+        """Write every pending page; returns the number of sessions written."""
+        async with self._flush_lock:
+            batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+            items = list(batch.items())
+            try:
+                async with get_db_context() as db:
+                    for start in range(0, len(items), FLUSH_BATCH_SIZE):
+                        await db.execute(
+                            self._update(items[start : start + FLUSH_BATCH_SIZE])
+                        )
+                    await db.commit()
+            except Exception:
+                # Put the batch back under anything recorded since; the next
+                # flush retries it.
+                for session_id, last_page in items:
+                    self._pending.setdefault(session_id, last_page)
+                raise
+            return len(items)
+
+    @staticmethod
+    def _update(rows: list[tuple[UUID, int]]):
+        progress = values(
+            column("id", Uuid), column("last_page", Integer), name="progress"
+        ).data(rows)
+        return (
+            update(UserReadingSession)
+            .where(
+                UserReadingSession.id == progress.c.id,
+                UserReadingSession.is_deleted.is_(False),
+            )
+            .values(last_page=progress.c.last_page, updated_at=func.now())
+            .execution_options(synchronize_session=False)
+        )
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.max_staleness)
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Reading progress flush failed; will retry")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Let the flusher finish its round, then write what is left.
+
+        The task is woken rather than cancelled so a batch is never dropped
+        halfway through its UPDATE.
+        """
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+
+reading_progress = (
+    ReadingProgressBuffer(
+        db_config.reading_progress_max_staleness,
+        db_config.reading_progress_max_pending,
+    )
+    if db_config.reading_progress_write_behind
+    else None
+)
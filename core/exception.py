@@ -130,6 +130,25 @@ class NotFound(BaseException):
         )
 
 
+class ServiceUnavailable(BaseException):
+    def __init__(
+        self,
+        exception_type: str = "Service Unavailable",
+        msg: str | None = None,
+        loc: list[str] | None = None,
+        detail: Any | None = None,
+        headers: Dict[str, Any] | None = None,
+    ) -> None:
+        super().__init__(
+            exception_type,
+            msg=msg,
+            loc=loc,
+            detail=detail,
+            headers=headers,
+            status_code=503,
+        )
+
+
 AUTHENTICATION_EXCEPTION = AuthenticationError(
     exception_type="user.not_authenticated",
     msg="Could not validate credentials",
@@ -140,3 +159,9 @@ REFRESH_TOKEN_EXCEPTION = BadRequest(
     exception_type="user.invalid_refresh_token",
     msg="Could not validate refresh token",
 )
+
+PASSWORD_HASHER_BUSY_EXCEPTION = ServiceUnavailable(
+    exception_type="auth.password_hasher_busy",
+    msg="Too many concurrent password checks, please retry shortly",
+    headers={"Retry-After": "1"},
+)
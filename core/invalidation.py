@@ -0,0 +1,130 @@
+"""Cross-worker cache invalidation over Postgres LISTEN/NOTIFY.
+
+``Base.create/update/soft_delete/hard_delete`` on a table that backs a cached
+namespace call :func:`notify_change` before committing, which queues
+``pg_notify`` on :data:`CHANNEL` with the table and primary key. Postgres
+delivers it to every listener when (and only if) the write commits.
+
+Every worker runs one :class:`InvalidationListener` on its own connection,
+outside the pool, and evicts the namespaces fed by the changed table. When the
+connection drops, notifications sent in the meantime are lost, so the
+listener reconnects with backoff and flushes every watched namespace as soon
+as it is listening again.
+"""
+
+import asyncio
+import json
+import logging
+
+import asyncpg
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.cache import CacheBackend, cache
+from core.db import engine
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "cache_invalidation"
+
+# table -> cache namespaces built from it
+NAMESPACES_BY_TABLE = {
+    "category": ("categories",),
+    "tag": ("tags",),
+}
+
+RECONNECT_MIN_DELAY = 0.5
+RECONNECT_MAX_DELAY = 30.0
+# A quiet LISTEN connection is probed this often so a dead peer is noticed.
+KEEPALIVE_INTERVAL = 30.0
+
+
+async def notify_change(db: AsyncSession, instance) -> None:
+    """Queue an invalidation for ``instance``'s row; sent when ``db`` commits.
+
+    A no-op for tables no cache is built from, so other writes pay nothing.
+    """
+    table = instance.__tablename__
+    if table not in NAMESPACES_BY_TABLE:
+        return
+    if instance.id is None:
+        await db.flush()  # assigns the primary key of a pending row
+    payload = json.dumps({"table": table, "id": str(instance.id)})
+    await db.execute(select(func.pg_notify(CHANNEL, payload)))
+
+
+class InvalidationListener:
+    def __init__(self, connect_kwargs: dict, backend: CacheBackend = cache) -> None:
+        self.connect_kwargs = connect_kwargs
+        self.backend = backend
+        self._task: asyncio.Task | None = None
+        self._evictions: set[asyncio.Task] = set()
+
+    async def flush_all(self) -> None:
+        for namespaces in NAMESPACES_BY_TABLE.values():
+            for namespace in namespaces:
+                await self.backend.invalidate(namespace)
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        try:
+            table = json.loads(payload)["table"]
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring malformed invalidation %r", payload)
+            return
+        for namespace in NAMESPACES_BY_TABLE.get(table, ()):
+            task = asyncio.create_task(self.backend.invalidate(namespace))
+            self._evictions.add(task)
+            task.add_done_callback(self._evictions.discard)
+
+    async def _listen_once(self) -> None:
+        """Hold one LISTEN connection until it is lost."""
+        connection = await asyncpg.connect(**self.connect_kwargs)
+        try:
+            lost = asyncio.Event()
+            connection.add_termination_listener(lambda _: lost.set())
+            await connection.add_listener(CHANNEL, self._on_notify)
+            # Anything committed before LISTEN took effect was missed.
+            await self.flush_all()
+            while not lost.is_set():
+                try:
+                    await asyncio.wait_for(lost.wait(), KEEPALIVE_INTERVAL)
+                except TimeoutError:
+                    await connection.execute("SELECT 1")
+        finally:
+            if not connection.is_closed():
+                await connection.close()
+
+    async def _run(self) -> None:
+        delay = RECONNECT_MIN_DELAY
+        while True:
+            connected_at = asyncio.get_running_loop().time()
+            try:
+                await self._listen_once()
+            except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError) as exc:
+                logger.warning("Cache invalidation listener lost: %s", exc)
+            else:
+                logger.warning("Cache invalidation listener connection closed")
+            # A connection that held for a while resets the backoff.
+            if asyncio.get_running_loop().time() - connected_at > RECONNECT_MAX_DELAY:
+                delay = RECONNECT_MIN_DELAY
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Same server and credentials as the pool, as the dialect hands them to asyncpg.
+invalidation_listener = InvalidationListener(
+    engine.dialect.create_connect_args(engine.url)[1]
+)
@@ -0,0 +1,187 @@
+"""In-process metric collectors.
+
+Collectors are plain counters guarded only by the GIL: observations come from
+the event loop thread (and occasionally the threadpool), and a lost increment
+under contention is an acceptable price for keeping ``observe`` to a bisect
+and two additions. :func:`render` writes every registered metric in the
+Prometheus text exposition format for ``GET /metrics``.
+"""
+
+from bisect import bisect_left
+from collections.abc import Callable
+
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+REGISTRY: list["Metric"] = []
+
+
+class Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames=()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple, "Metric"] = {}
+        REGISTRY.append(self)
+
+    def labels(self, *values):
+        values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def samples(self):
+        """Yield ``(label_values, child)`` for every series of this metric."""
+        if not self.labelnames:
+            yield (), self
+        yield from self._children.items()
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames=()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.value = 0.0
+
+    def _new_child(self):
+        child = Counter.__new__(Counter)
+        child.value = 0.0
+        return child
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames=(),
+        buckets=DEFAULT_BUCKETS,
+    ) -> None:
+        self.buckets = tuple(buckets)
+        super().__init__(name, documentation, labelnames)
+        self._reset()
+
+    def _reset(self) -> None:
+        # One slot per bucket plus +Inf; cumulative counts are built on read.
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+
+    def _new_child(self):
+        child = Histogram.__new__(Histogram)
+        child.buckets = self.buckets
+        child._reset()
+        return child
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+
+class Gauge(Metric):
+    """A value that goes up and down.
+
+    With ``function`` the value is read from it at scrape time instead, which
+    keeps state that already exists elsewhere (pool sizes) free to track.
+    """
+
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames=(),
+        function: Callable[[], float] | None = None,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._value = 0.0
+        self.function = function
+
+    def _new_child(self):
+        child = Gauge.__new__(Gauge)
+        child._value = 0.0
+        child.function = None
+        return child
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._value -= amount
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    @property
+    def value(self) -> float:
+        return self.function() if self.function is not None else self._value
+
+
+def _format_labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def render(registry=REGISTRY) -> str:
+    """All metrics in the Prometheus text format, version 0.0.4."""
+    lines = []
+    for metric in registry:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        for values, child in metric.samples():
+            if isinstance(metric, Histogram):
+                cumulative = 0
+                bounds = (*metric.buckets, float("inf"))
+                for bound, count in zip(bounds, child.counts):
+                    cumulative += count
+                    le = f'le="{_format_value(bound)}"'
+                    labels = _format_labels(metric.labelnames, values, le)
+                    lines.append(f"{metric.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(metric.labelnames, values)
+                lines.append(f"{metric.name}_sum{labels} {_format_value(child.sum)}")
+                lines.append(f"{metric.name}_count{labels} {cumulative}")
+            else:
+                labels = _format_labels(metric.labelnames, values)
+                lines.append(f"{metric.name}{labels} {_format_value(child.value)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,87 @@
+"""Per-route request metrics and query profiling.
+
+A pure ASGI middleware rather than ``BaseHTTPMiddleware``: it adds no task or
+memory stream per request, only a ``perf_counter`` pair and two dict lookups.
+Latency is labelled by the route template (``/ebooks/{ebook_id}``), which
+Starlette sets on the scope once routing has matched, so label cardinality
+stays bounded by the number of routes.
+"""
+
+import time
+
+from config import db_config
+from core.metrics import Counter, Gauge, Histogram
+from core.profiling import RequestProfile, current_profile, report
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to sending the last response byte.",
+    labelnames=("method", "route"),
+)
+REQUESTS = Counter(
+    "http_requests_total",
+    "Requests handled, by response status.",
+    labelnames=("method", "route", "status"),
+)
+IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Requests currently being handled.",
+)
+
+
+class MetricsMiddleware:
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            IN_FLIGHT.dec()
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            method = scope["method"]
+            REQUEST_DURATION.labels(method, path).observe(elapsed)
+            REQUESTS.labels(method, path, status).inc()
+
+
+class ProfileMiddleware:
+    """Profile each request's queries; see :mod:`core.profiling`."""
+
+    def __init__(self, app, server_timing: bool = db_config.server_timing) -> None:
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        profile = RequestProfile(scope)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and self.server_timing:
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", profile.server_timing().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = current_profile.set(profile)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_profile.reset(token)
+            report(profile, scope["method"])
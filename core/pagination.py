@@ -0,0 +1,88 @@
+import base64
+import binascii
+import struct
+from dataclasses import dataclass
+from uuid import UUID
+
+from fastapi import Query
+
+from core.exception import BadRequest
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(id: UUID) -> str:
+    return base64.urlsafe_b64encode(id.bytes).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str) -> UUID:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        return UUID(bytes=raw)
+    except (binascii.Error, ValueError):
+        raise BadRequest(msg="Invalid pagination cursor", loc=["query", "cursor"])
+
+
+def encode_ranked_cursor(rank: float, id: UUID) -> str:
+    """Cursor for result lists ordered on ``(rank DESC, id)``."""
+    raw = struct.pack(">d", rank) + id.bytes
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_ranked_cursor(cursor: str) -> tuple[float, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        (rank,) = struct.unpack(">d", raw[:8])
+        return rank, UUID(bytes=raw[8:])
+    except (binascii.Error, struct.error, ValueError):
+        raise BadRequest(msg="Invalid pagination cursor", loc=["query", "cursor"])
+
+
+def encode_position_cursor(position: int, id: UUID) -> str:
+    """Cursor for result lists ordered on ``(position, id)``, e.g. page numbers."""
+    raw = struct.pack(">q", position) + id.bytes
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_position_cursor(cursor: str) -> tuple[int, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        (position,) = struct.unpack(">q", raw[:8])
+        return position, UUID(bytes=raw[8:])
+    except (binascii.Error, struct.error, ValueError):
+        raise BadRequest(msg="Invalid pagination cursor", loc=["query", "cursor"])
+
+
+@dataclass
+class PageParams:
+    """Keyset pagination query parameters shared by the list endpoints.
+
+    Pages are ordered on the uuid7 primary key, which is time-ordered, so
+    ``reverse`` returns the newest rows first.
+    """
+
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+    cursor: str | None = None
+    reverse: bool = False
+
+
+def apply_keyset(query, column, page: PageParams):
+    """Order ``query`` on ``column`` and restrict it to the page after the cursor.
+
+    One extra row is fetched so :func:`build_page` can tell whether another
+    page follows without a COUNT.
+    """
+    if page.cursor is not None:
+        last = decode_cursor(page.cursor)
+        query = query.where(column < last if page.reverse else column > last)
+    query = query.order_by(column.desc() if page.reverse else column)
+    return query.limit(page.limit + 1)
+
+
+def build_page(rows, page: PageParams, key) -> dict:
+    next_cursor = None
+    if len(rows) > page.limit:
+        rows = rows[: page.limit]
+        next_cursor = encode_cursor(key(rows[-1]))
+    return {"items": rows, "next_cursor": next_cursor}
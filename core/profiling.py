@@ -0,0 +1,195 @@
+"""Per-request query profiling.
+
+:class:`ProfileMiddleware` (core/middleware.py) puts a :class:`RequestProfile`
+in :data:`current_profile` for each request. Engine cursor events add every
+statement and its time to it, and :func:`timed` adds named phases (``auth``,
+``serialize``). When the response starts, the totals go out as a
+``Server-Timing`` header; when it ends, any statement executed
+``N_PLUS_ONE_THRESHOLD`` times or more is logged as a likely N+1 together
+with the route.
+
+Statements are grouped by their SQL text, which is the same for every
+execution of one query whatever its parameters, so a lazy load in a loop
+shows up as one text with a high count.
+
+``serialize`` covers :func:`core.serialization.dump_json` only; routes that
+leave serialization to FastAPI report it as part of ``app``.
+"""
+
+import logging
+import time
+from collections import Counter as StatementCounter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+
+from config import db_config
+from core.metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+N_PLUS_ONE_THRESHOLD = db_config.n_plus_one_threshold
+SLOW_QUERY_SECONDS = db_config.slow_query_ms / 1000
+
+QUERIES_PER_REQUEST = Histogram(
+    "http_request_db_queries",
+    "Statements executed per request.",
+    labelnames=("route",),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+N_PLUS_ONE = Counter(
+    "db_n_plus_one_total",
+    "Requests in which one statement ran at least the N+1 threshold times.",
+    labelnames=("route",),
+)
+SLOW_QUERIES = Counter(
+    "db_slow_queries_total",
+    "Statements slower than SLOW_QUERY_MS.",
+    labelnames=("route",),
+)
+
+
+def route_of(scope) -> str:
+    """The matched route template, once routing has run."""
+    route = scope.get("route") if scope is not None else None
+    return route.path if route is not None else "unmatched"
+
+
+@dataclass
+class RequestProfile:
+    scope: dict | None = None
+    started: float = field(default_factory=time.perf_counter)
+    queries: int = 0
+    db_seconds: float = 0.0
+    statements: StatementCounter = field(default_factory=StatementCounter)
+    phases: dict[str, float] = field(default_factory=dict)
+
+    @property
+    def route(self) -> str:
+        return route_of(self.scope)
+
+    def server_timing(self) -> str:
+        metrics = [f'db;dur={self.db_seconds * 1000:.2f};desc="{self.queries} queries"']
+        metrics += [
+            f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.phases.items()
+        ]
+        metrics.append(f"app;dur={(time.perf_counter() - self.started) * 1000:.2f}")
+        return ", ".join(metrics)
+
+    def repeated_statements(self, threshold: int = N_PLUS_ONE_THRESHOLD):
+        return [
+            (statement, count)
+            for statement, count in self.statements.most_common()
+            if count >= threshold
+        ]
+
+
+current_profile: ContextVar[RequestProfile | None] = ContextVar(
+    "current_profile", default=None
+)
+
+
+@contextmanager
+def timed(phase: str):
+    """Add the time spent in the block to ``phase`` of the current request."""
+    profile = current_profile.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.phases[phase] = (
+            profile.phases.get(phase, 0.0) + time.perf_counter() - started
+        )
+
+
+def report(profile: RequestProfile, method: str) -> None:
+    """Record and log what ``profile`` saw once its request has finished."""
+    route = profile.route
+    QUERIES_PER_REQUEST.labels(route).observe(profile.queries)
+    repeated = profile.repeated_statements()
+    if repeated:
+        N_PLUS_ONE.labels(route).inc()
+        for statement, count in repeated:
+            logger.warning(
+                "Possible N+1 on %s %s: %d executions of %s",
+                method,
+                route,
+                count,
+                " ".join(statement.split())[:300],
+            )
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, many):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, many):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    profile = current_profile.get()
+    if profile is not None:
+        profile.queries += 1
+        profile.db_seconds += elapsed
+        profile.statements[statement] += 1
+    if elapsed >= SLOW_QUERY_SECONDS:
+        route = profile.route if profile is not None else "-"
+        SLOW_QUERIES.labels(route).inc()
+        logger.warning(
+            "Slow query (%.1f ms) on %s: %s",
+            elapsed * 1000,
+            route,
+            " ".join(statement.split())[:1000],
+        )
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute.
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_started"):
+        connection.info["query_started"].pop()
+
+
+def profile_queries(engine) -> None:
+    sync_engine = engine.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+
+@contextmanager
+def assert_max_queries(limit: int, engine=None):
+    """Fail if the block executes more than ``limit`` statements.
+
+    For tests, around a request through the app::
+
+        with assert_max_queries(2):
+            response = await client.get("/ebooks")
+
+    Counts every statement on ``engine`` (the app's by default) while the
+    block runs and yields the list they are collected in.
+    """
+    if engine is None:
+        from core.db import engine
+
+    statements = []
+
+    def collect(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "after_cursor_execute", collect)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "after_cursor_execute", collect)
+    if len(statements) > limit:
+        listing = "\n".join(
+            f"  {number}. {' '.join(statement.split())[:200]}"
+            for number, statement in enumerate(statements, 1)
+        )
+        raise AssertionError(
+            f"{len(statements)} queries executed, expected at most {limit}:\n{listing}"
+        )
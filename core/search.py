@@ -0,0 +1,8 @@
+"""Full-text search helpers shared by the routers."""
+
+import re
+
+
+def prefix_tsquery(q: str) -> str:
+    """``"dune herb"`` -> ``"dune:* & herb:*"``; only word characters survive."""
+    return " & ".join(f"{term}:*" for term in re.findall(r"\w+", q.lower()))
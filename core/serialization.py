@@ -0,0 +1,43 @@
+"""Single-pass JSON responses for ORM results.
+
+Returning ORM objects from a route with a ``response_model`` makes FastAPI
+validate them into Pydantic models, dump those to Python dicts and then
+``json.dumps`` the dicts. :func:`json_response` validates once, straight from
+attributes, and lets pydantic-core write the JSON bytes, which skips the two
+Python-level passes. The saving grows with the page: about 1.5x per item at
+200 items, but on small pages the two paths can come out even. Routes keep their ``response_model`` so the OpenAPI
+schema is unchanged; FastAPI passes a returned ``Response`` through as is.
+
+Pass the concrete type of what is returned (``Page[EBookSchema]``, not the
+route's ``Page[EBookSchema] | EBookSchema``): a union is validated against
+every member, which doubles the cost.
+
+``python -m benchmarks.serialization`` compares the two paths.
+"""
+
+from functools import lru_cache
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from core.profiling import timed
+
+
+@lru_cache
+def adapter_for(response_type) -> TypeAdapter:
+    """One compiled validator/serializer per response type."""
+    return TypeAdapter(response_type)
+
+
+def dump_json(response_type, content) -> bytes:
+    adapter = adapter_for(response_type)
+    with timed("serialize"):
+        return adapter.dump_json(adapter.validate_python(content, from_attributes=True))
+
+
+def json_response(response_type, content, headers=None) -> Response:
+    return Response(
+        dump_json(response_type, content),
+        media_type="application/json",
+        headers=headers,
+    )
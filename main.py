@@ -1,12 +1,47 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
+from config import cache_config
+from core.auth.security import pwd_context
+from core.db import replicas
+from core.db.archive import archiver
+from core.db.write_behind import reading_progress
+from core.invalidation import invalidation_listener
+from core.middleware import MetricsMiddleware, ProfileMiddleware
 from routers.book import app as book_router
+from routers.metrics import app as metrics_router
+from routers.note import app as note_router
 from routers.user import app as user_router
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if cache_config.cache_backend != "none":
+        invalidation_listener.start()
+    if reading_progress is not None:
+        reading_progress.start()
+    replicas.start()
+    if archiver is not None:
+        archiver.start()
+    yield
+    if archiver is not None:
+        await archiver.stop()
+    await replicas.stop()
+    if reading_progress is not None:
+        await reading_progress.stop()
+    await invalidation_listener.stop()
+    pwd_context.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(ProfileMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(book_router, tags=["Book"])
 app.include_router(user_router, tags=["User"])
+app.include_router(note_router, tags=["Note"])
+app.include_router(metrics_router)
 
 
 @app.get("/")
@@ -1,13 +1,22 @@
 from datetime import datetime, timezone
 
-from sqlalchemy import Boolean, DateTime, and_, func
+from sqlalchemy import Boolean, DateTime, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.ext.declarative import declared_attr
-from sqlalchemy.orm import Mapped, Session, declarative_base, mapped_column
+from sqlalchemy.orm import Mapped, declarative_base, mapped_column
 
 from config import BASE_DIR
+from core.invalidation import notify_change
+from core.pagination import apply_keyset, build_page
 
 initial_base = declarative_base()
 
+# Predicate of the partial indexes behind ``Base.get`` and ``Base.paginate``:
+# they only hold live rows, so soft-deleted rows are never walked past. It is
+# spelled exactly like the ``is_deleted.is_(False)`` filter those queries
+# render; Postgres will not match ``IS false`` against ``NOT is_deleted``.
+LIVE_ROWS = text("is_deleted IS false AND is_active")
+
 
 # class Base(initial_base):
 class Base(initial_base):
@@ -72,41 +81,69 @@ class Base(initial_base):
             deferred_group="status",
         )
 
-    def create(self, db):
+    async def create(self, db: AsyncSession):
         db.add(self)
-        db.commit()
-        db.refresh(self)
+        await notify_change(db, self)
+        await db.commit()
+        await db.refresh(self)
         return self
 
-    def update(self, db):
+    async def update(self, db: AsyncSession):
         db.add(self)
-        db.commit()
-        db.refresh(self)
+        await notify_change(db, self)
+        await db.commit()
+        await db.refresh(self)
         return self
 
-    def soft_delete(self, db: Session):
+    async def soft_delete(self, db: AsyncSession):
         self.is_deleted = True
         self.deleted_at = datetime.now(tz=timezone.utc)
         self.is_active = False  # Optional: You can choose to deactivate it
-        return self.update(db)
+        return await self.update(db)
+
+    async def hard_delete(self, db: AsyncSession):
+        await notify_change(db, self)
+        await db.delete(self)
+        await db.commit()
 
-    def hard_delete(self, db: Session):
-        db.delete(self)
-        db.commit()
+    @classmethod
+    def get_query(cls, id=None, options=()):
+        """The statement behind :meth:`get`."""
+        query = (
+            select(cls)
+            .where(cls.is_deleted.is_(False), cls.is_active)
+            .options(*options)
+        )
+        return query if id is None else query.where(cls.id == id)
 
     @classmethod
-    def get(cls, db, id=None):
+    async def get(cls, db: AsyncSession, id=None, options=()):
+        """Fetch one live row by id, or every live row when id is None.
+
+        ``options`` are loader options (``selectinload`` etc.); relationships
+        cannot be lazy-loaded on an async session, so anything the caller
+        serializes has to be loaded here.
+        """
+        query = cls.get_query(id, options)
         if id is None:
-            return (
-                db.query(cls)
-                .filter(and_(cls.is_deleted.is_(False), cls.is_active))
-                .all()
-            )
-        return (
-            db.query(cls)
-            .filter(and_(cls.id == id, cls.is_deleted.is_(False), cls.is_active))
-            .first()
+            return (await db.scalars(query)).all()
+        return (await db.scalars(query)).first()
+
+    @classmethod
+    async def paginate(cls, db: AsyncSession, page, options=()):
+        """Return one keyset page of live rows as ``{items, next_cursor}``.
+
+        ``page`` is a :class:`core.pagination.PageParams`. Rows are ordered on
+        ``id`` and the cursor is the last id of the previous page, so every page
+        is an index range scan instead of an OFFSET.
+        """
+        query = (
+            select(cls)
+            .where(cls.is_deleted.is_(False), cls.is_active)
+            .options(*options)
         )
+        rows = (await db.scalars(apply_keyset(query, cls.id, page))).all()
+        return build_page(rows, page, key=lambda row: row.id)
 
 
 def load_models():
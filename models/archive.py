@@ -0,0 +1,75 @@
+"""Archive tables for soft-deleted rows (see core/db/archive.py).
+
+``<table>_archive`` mirrors a table's columns, without its constraints,
+indexes or generated columns, plus ``archived_at``. Archiving a row also
+archives every row that references it, so there is an archive for each root
+in :data:`ARCHIVE_ROOTS` and for every table below it in the foreign-key
+graph.
+"""
+
+from sqlalchemy import Column, DateTime, Index, Table, func, text
+
+from models import Base
+from models.book import Bookmark
+from models.user import User, UserReadingSession
+
+# Tables whose soft-deleted rows are archived. Importing their models also
+# registers every table that references them before the mirrors are built.
+ARCHIVE_ROOTS = tuple(
+    model.__tablename__ for model in (User, Bookmark, UserReadingSession)
+)
+# Predicate of the roots' ``deleted_at`` indexes, spelled like the archiver's
+# ``is_deleted.is_(True)`` filter so the planner can match it.
+SOFT_DELETED = text("is_deleted IS true")
+
+
+def referencing(table: Table) -> list[tuple[Table, object]]:
+    """``(child, foreign_key)`` for every foreign key pointing at ``table``."""
+    return [
+        (child, foreign_key)
+        for child in Base.metadata.sorted_tables
+        for foreign_key in child.foreign_keys
+        if foreign_key.column.table is table
+    ]
+
+
+def with_descendants(table: Table) -> list[Table]:
+    tables = [table]
+    for child, _ in referencing(table):
+        tables += [t for t in with_descendants(child) if t not in tables]
+    return tables
+
+
+def mirror(table: Table) -> Table:
+    return Table(
+        f"{table.name}_archive",
+        Base.metadata,
+        *(
+            Column(
+                column.name,
+                column.type,
+                primary_key=column.primary_key,
+                nullable=column.nullable,
+            )
+            for column in table.columns
+            if column.computed is None
+        ),
+        Column(
+            "archived_at",
+            DateTime(timezone=True),
+            server_default=func.now(),
+            nullable=False,
+            index=True,
+        ),
+    )
+
+
+ARCHIVES: dict[str, Table] = {}
+for root in ARCHIVE_ROOTS:
+    root_table = Base.metadata.tables[root]
+    Index(
+        f"ix_{root}_deleted_at", root_table.c.deleted_at, postgresql_where=SOFT_DELETED
+    )
+    for table in with_descendants(root_table):
+        if table.name not in ARCHIVES:
+            ARCHIVES[table.name] = mirror(table)
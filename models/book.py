@@ -1,24 +1,62 @@
 from typing import TYPE_CHECKING
 from uuid import UUID
 
-from sqlalchemy import ForeignKey, Integer, String
+from sqlalchemy import (
+    ARRAY,
+    Computed,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Uuid,
+    any_,
+    exists,
+    false,
+    func,
+    literal,
+    select,
+    true,
+    union_all,
+    update,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR, insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from uuid_extensions import uuid7
 
-from models import Base
+from core.db import uuid_array
+from models import LIVE_ROWS, Base
 
 if TYPE_CHECKING:
     from models.user import User, UserReadingSession
 
 
 class EBook(Base):
-    id: Mapped[UUID] = mapped_column(default=uuid7, primary_key=True, index=True)
+    __table_args__ = (
+        Index("ix_ebook_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_ebook_live_id", "id", postgresql_where=LIVE_ROWS),
+        Index("ix_ebook_category_id", "category_id"),
+    )
+
+    id: Mapped[UUID] = mapped_column(default=uuid7, primary_key=True)
     title: Mapped[str] = mapped_column(String(255))
     author: Mapped[str | None] = mapped_column(String(255))
     description: Mapped[str | None] = mapped_column(String(500))
     file_url: Mapped[str] = mapped_column(String(500))
     cover_image: Mapped[str | None] = mapped_column(String(500))
     category_id: Mapped[UUID] = mapped_column(ForeignKey("category.id"))
+    # Maintained by Postgres; title matches outrank author, author description.
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(author, '')), 'B') || "
+            "setweight(to_tsvector('english', coalesce(description, '')), 'C')",
+            persisted=True,
+        ),
+        deferred=True,
+        deferred_raiseload=True,
+    )
     category: Mapped["Category"] = relationship(back_populates="ebooks")
     tags: Mapped[list["EBookTag"]] = relationship(back_populates="ebook")
 
@@ -28,7 +66,9 @@ class EBook(Base):
 
 
 class Category(Base):
-    id: Mapped[UUID] = mapped_column(default=uuid7, primary_key=True, index=True)
+    __table_args__ = (Index("ix_category_live_id", "id", postgresql_where=LIVE_ROWS),)
+
+    id: Mapped[UUID] = mapped_column(default=uuid7, primary_key=True)
     name: Mapped[str] = mapped_column(String(255), unique=True)
     description: Mapped[str | None] = mapped_column(String(500), nullable=True)
 
@@ -36,7 +76,9 @@ class Category(Base):
 
 
 class Tag(Base):
-    id: Mapped[UUID] = mapped_column(default=uuid7, primary_key=True, index=True)
+    __table_args__ = (Index("ix_tag_live_id", "id", postgresql_where=LIVE_ROWS),)
+
+    id: Mapped[UUID] = mapped_column(default=uuid7, primary_key=True)
     name: Mapped[str] = mapped_column(String(255), unique=True)
 
     ebook_tags: Mapped[list["EBookTag"]] = relationship(back_populates="tag")
@@ -49,22 +91,247 @@ class EBookTag(Base):
     ebook: Mapped["EBook"] = relationship(back_populates="tags")
     tag: Mapped["Tag"] = relationship(back_populates="ebook_tags")
 
+    @classmethod
+    async def attach(
+        cls, db: AsyncSession, tags_by_ebook: dict[UUID, list[UUID]]
+    ) -> int:
+        """Link every ebook to its tags in one statement and one commit.
+
+        Pairs are sent as two parallel ``uuid[]`` parameters and expanded
+        server-side with ``unnest``; pairs that already exist are skipped.
+        Returns the number of new links.
+        """
+        pairs = {
+            (ebook_id, tag_id)
+            for ebook_id, tag_ids in tags_by_ebook.items()
+            for tag_id in tag_ids
+        }
+        if not pairs:
+            return 0
+        ebook_ids, tag_ids = zip(*pairs)
+        rows = select(
+            func.unnest(uuid_array(ebook_ids)),
+            func.unnest(uuid_array(tag_ids)),
+            false(),
+            true(),
+        )
+        result = await db.execute(
+            insert(cls)
+            .from_select(["ebook_id", "tag_id", "is_deleted", "is_active"], rows)
+            .on_conflict_do_nothing(index_elements=["ebook_id", "tag_id"])
+        )
+        await db.commit()
+        return result.rowcount
+
 
 class Bookmark(Base):
-    id: Mapped[UUID] = mapped_column(default=uuid7, primary_key=True, index=True)
+    # One bookmark per page; the leading user_id also serves "my bookmarks".
+    # ebook_id alone backs loading and versioning an ebook's bookmarks, and
+    # (user_id, updated_at, id) the keyset scan of GET /user/sync.
+    __table_args__ = (
+        Index(
+            "uq_bookmark_user_ebook_page",
+            "user_id",
+            "ebook_id",
+            "page_number",
+            unique=True,
+        ),
+        Index("ix_bookmark_ebook_id", "ebook_id"),
+        Index("ix_bookmark_user_updated", "user_id", "updated_at", "id"),
+    )
+
+    id: Mapped[UUID] = mapped_column(default=uuid7, primary_key=True)
     user_id: Mapped[UUID] = mapped_column(ForeignKey("user.id"))
     ebook_id: Mapped[UUID] = mapped_column(ForeignKey("ebook.id"))
     page_number: Mapped[int] = mapped_column(Integer)
     user: Mapped["User"] = relationship(back_populates="bookmarks")
     ebook: Mapped["EBook"] = relationship(back_populates="bookmarks")
 
+    @classmethod
+    async def add(cls, db: AsyncSession, user_id, ebook_id: UUID, page_number: int):
+        """Bookmark a page of a live ebook in a single statement.
+
+        The row is inserted from a SELECT on the ebook, so a missing ebook
+        inserts nothing, and the unique (user_id, ebook_id, page_number) index
+        absorbs repeated or concurrent requests: a deleted bookmark is
+        revived, and a live one is returned as it is, without writing a new
+        row version (which would show up as a change in ``GET /user/sync``).
+        Returns the bookmark's ``id``, ``ebook_id`` and ``page_number``, or
+        None if the ebook is gone.
+        """
+        live_ebook = (
+            EBook.id == ebook_id,
+            EBook.is_deleted.is_(False),
+            EBook.is_active,
+        )
+        rows = select(
+            literal(uuid7(), Uuid),
+            literal(user_id, Uuid),
+            EBook.id,
+            literal(page_number, Integer),
+            false(),
+            true(),
+        ).where(*live_ebook)
+        upserted = (
+            insert(cls)
+            .from_select(
+                ["id", "user_id", "ebook_id", "page_number", "is_deleted", "is_active"],
+                rows,
+            )
+            .on_conflict_do_update(
+                index_elements=["user_id", "ebook_id", "page_number"],
+                set_={
+                    "is_deleted": False,
+                    "is_active": True,
+                    "deleted_at": None,
+                    "updated_at": func.now(),
+                },
+                where=cls.is_deleted.is_(True) | cls.is_active.is_(False),
+            )
+            .returning(cls.id, cls.ebook_id, cls.page_number)
+            .cte("upserted")
+        )
+        existing = (
+            select(cls.id, cls.ebook_id, cls.page_number)
+            .join(cls.ebook)
+            .where(
+                cls.user_id == user_id,
+                cls.ebook_id == ebook_id,
+                cls.page_number == page_number,
+                *live_ebook,
+            )
+        )
+        result = await db.execute(
+            union_all(
+                select(upserted),
+                existing.where(~exists(select(upserted.c.id))),
+            )
+        )
+        bookmark = result.mappings().first()
+        if bookmark is None:
+            # A concurrent insert of the same bookmark committed after this
+            # statement's snapshot was taken; it is visible now.
+            bookmark = (await db.execute(existing)).mappings().first()
+        await db.commit()
+        return bookmark
+
 
 class Note(Base):
-    id: Mapped[UUID] = mapped_column(default=uuid7, primary_key=True, index=True)
+    # A user's notes on a book in page order, for the per-book listing, and
+    # in change order for GET /user/sync.
+    __table_args__ = (
+        Index("ix_note_user_ebook_page", "user_id", "ebook_id", "page_number"),
+        Index("ix_note_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_note_user_updated", "user_id", "updated_at", "id"),
+    )
+
+    id: Mapped[UUID] = mapped_column(default=uuid7, primary_key=True)
     user_id: Mapped[UUID] = mapped_column(ForeignKey("user.id"))
     ebook_id: Mapped[UUID] = mapped_column(ForeignKey("ebook.id"))
     page_number: Mapped[int] = mapped_column(Integer)
     content: Mapped[str] = mapped_column(String(1000))
+    # Maintained by Postgres, like EBook.search_vector.
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed("to_tsvector('english', content)", persisted=True),
+        deferred=True,
+        deferred_raiseload=True,
+    )
 
     user: Mapped["User"] = relationship(back_populates="notes")
     ebook: Mapped["EBook"] = relationship(back_populates="notes")
+
+    @classmethod
+    async def add_many(cls, db: AsyncSession, user_id, notes) -> list:
+        """Insert a batch of notes in one statement and one commit.
+
+        ``notes`` have ``ebook_id``, ``page_number`` and ``content``; they are
+        sent as parallel array parameters and expanded with ``unnest``, so the
+        statement has the same five parameters however many notes there are.
+        Returns the new notes' ``id``, ``ebook_id``, ``page_number`` and
+        ``content`` in the order given.
+        """
+        if not notes:
+            return []
+        ids = [uuid7() for _ in notes]
+        rows = select(
+            func.unnest(uuid_array(ids)),
+            literal(user_id, Uuid),
+            func.unnest(uuid_array(note.ebook_id for note in notes)),
+            func.unnest(literal([note.page_number for note in notes], ARRAY(Integer))),
+            func.unnest(literal([note.content for note in notes], ARRAY(String))),
+            false(),
+            true(),
+        )
+        result = await db.execute(
+            insert(cls)
+            .from_select(
+                [
+                    "id",
+                    "user_id",
+                    "ebook_id",
+                    "page_number",
+                    "content",
+                    "is_deleted",
+                    "is_active",
+                ],
+                rows,
+            )
+            .returning(cls.id, cls.ebook_id, cls.page_number, cls.content)
+        )
+        created = {row["id"]: row for row in result.mappings()}
+        await db.commit()
+        return [created[id] for id in ids]
+
+    @classmethod
+    async def update_many(cls, db: AsyncSession, user_id, changes) -> list:
+        """Apply a batch of edits to the user's live notes in one statement.
+
+        ``changes`` have an ``id`` and an optional new ``page_number`` and
+        ``content``; a None keeps the current value. Notes that are not the
+        user's, or are deleted, are left alone. Returns the updated notes.
+        """
+        if not changes:
+            return []
+        edits = select(
+            func.unnest(uuid_array(change.id for change in changes)).label("id"),
+            func.unnest(
+                literal([change.page_number for change in changes], ARRAY(Integer))
+            ).label("page_number"),
+            func.unnest(
+                literal([change.content for change in changes], ARRAY(String))
+            ).label("content"),
+        ).subquery()
+        result = await db.execute(
+            update(cls)
+            .where(
+                cls.id == edits.c.id,
+                cls.user_id == user_id,
+                cls.is_deleted.is_(False),
+                cls.is_active,
+            )
+            .values(
+                page_number=func.coalesce(edits.c.page_number, cls.page_number),
+                content=func.coalesce(edits.c.content, cls.content),
+            )
+            .returning(cls.id, cls.ebook_id, cls.page_number, cls.content)
+        )
+        updated = result.mappings().all()
+        await db.commit()
+        return updated
+
+    @classmethod
+    async def delete_many(cls, db: AsyncSession, user_id, ids) -> int:
+        """Soft-delete the user's live notes among ``ids``; returns how many."""
+        result = await db.execute(
+            update(cls)
+            .where(
+                cls.id == any_(uuid_array(ids)),
+                cls.user_id == user_id,
+                cls.is_deleted.is_(False),
+                cls.is_active,
+            )
+            .values(is_deleted=True, is_active=False, deleted_at=func.now())
+        )
+        await db.commit()
+        return result.rowcount
@@ -1,21 +1,38 @@
+from datetime import datetime
 from typing import TYPE_CHECKING
 from uuid import UUID
 
-from sqlalchemy import Boolean, ForeignKey, Integer, String
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy import (
+    Boolean,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Uuid,
+    false,
+    literal,
+    select,
+    true,
+)
+from sqlalchemy.dialects.postgresql import JSONB, insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from uuid_extensions import uuid7
 
 from core.auth.security import get_password_hash, verify_password
 from core.exception import AUTHENTICATION_EXCEPTION
-from models import Base
+from models import LIVE_ROWS, Base
+from models.book import EBook
 
 if TYPE_CHECKING:
-    from models.book import Bookmark, EBook, Note
+    from models.book import Bookmark, Note
 
 
 class User(Base):
-    id: Mapped[UUID] = mapped_column(default=uuid7, primary_key=True, index=True)
+    __table_args__ = (Index("ix_user_live_id", "id", postgresql_where=LIVE_ROWS),)
+
+    id: Mapped[UUID] = mapped_column(default=uuid7, primary_key=True)
     email: Mapped[str] = mapped_column(String(255), unique=True, index=True)
     password: Mapped[str] = mapped_column(String(255))
     full_name: Mapped[str | None] = mapped_column(String(255))
@@ -26,19 +43,19 @@ class User(Base):
         back_populates="user"
     )
 
-    def create(self, db):
-        self.password = get_password_hash(self.password)
-        return super().create(db)
+    async def create(self, db):
+        self.password = await get_password_hash(self.password)
+        return await super().create(db)
 
-    def update_password(self, old_password: str, new_password: str, db):
-        if not verify_password(old_password, self.password):
+    async def update_password(self, old_password: str, new_password: str, db):
+        if not await verify_password(old_password, self.password):
             raise AUTHENTICATION_EXCEPTION
-        self.password = get_password_hash(new_password)
-        return super().update(db)
+        self.password = await get_password_hash(new_password)
+        return await super().update(db)
 
 
 class UserProfile(Base):
-    id: Mapped[UUID] = mapped_column(default=uuid7, primary_key=True, index=True)
+    id: Mapped[UUID] = mapped_column(default=uuid7, primary_key=True)
     user_id: Mapped[UUID] = mapped_column(ForeignKey("user.id"), unique=True)
     dark_mode: Mapped[bool] = mapped_column(Boolean, default=False)
     preferences: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
@@ -47,10 +64,76 @@ class UserProfile(Base):
 
 
 class UserReadingSession(Base):
-    id: Mapped[UUID] = mapped_column(default=uuid7, primary_key=True, index=True)
+    # A user has at most one reading session per book. (user_id, updated_at,
+    # id) backs the keyset scan of GET /user/sync.
+    __table_args__ = (
+        Index("uq_userreadingsession_user_ebook", "user_id", "ebook_id", unique=True),
+        Index("ix_userreadingsession_user_updated", "user_id", "updated_at", "id"),
+    )
+
+    id: Mapped[UUID] = mapped_column(default=uuid7, primary_key=True)
     user_id: Mapped[UUID] = mapped_column(ForeignKey("user.id"))
     ebook_id: Mapped[UUID] = mapped_column(ForeignKey("ebook.id"))
     last_page: Mapped[int] = mapped_column(Integer)
 
     user: Mapped["User"] = relationship(back_populates="reading_sessions")
     ebook: Mapped["EBook"] = relationship(back_populates="sessions")
+
+    @classmethod
+    async def start(cls, db: AsyncSession, user_id, ebook_id: UUID):
+        """Open a session at page 0 in a single statement.
+
+        The row is inserted from a SELECT joining the live user and ebook, and
+        the unique (user_id, ebook_id) index turns a repeated or concurrent
+        request into a no-op. Returns the new session's ``id``, ``ebook_id``
+        and ``last_page``, or None when nothing was inserted.
+        """
+        rows = (
+            select(
+                literal(uuid7(), Uuid),
+                User.id,
+                EBook.id,
+                literal(0, Integer),
+                false(),
+                true(),
+            )
+            .join(EBook, EBook.id == ebook_id)
+            .where(
+                User.id == user_id,
+                User.is_deleted.is_(False),
+                User.is_active,
+                EBook.is_deleted.is_(False),
+                EBook.is_active,
+            )
+        )
+        result = await db.execute(
+            insert(cls)
+            .from_select(
+                ["id", "user_id", "ebook_id", "last_page", "is_deleted", "is_active"],
+                rows,
+            )
+            .on_conflict_do_nothing(index_elements=["user_id", "ebook_id"])
+            .returning(cls.id, cls.ebook_id, cls.last_page)
+        )
+        session = result.mappings().first()
+        await db.commit()
+        return session
+
+
+class RefreshToken(Base):
+    """One issued refresh token, identified by its ``jti`` claim.
+
+    Tokens minted from the same login share a ``family_id``. Each token can be
+    exchanged once; presenting an already-used token means it leaked, and the
+    whole family is revoked. Expired tokens are deleted by the archiver
+    (core/db/archive.py), which finds them through ``expires_at``.
+    """
+
+    __table_args__ = (Index("ix_refreshtoken_expires_at", "expires_at"),)
+
+    id: Mapped[UUID] = mapped_column(default=uuid7, primary_key=True)
+    user_id: Mapped[UUID] = mapped_column(ForeignKey("user.id"), index=True)
+    family_id: Mapped[UUID] = mapped_column(index=True)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    used_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    revoked_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
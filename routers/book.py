@@ -1,17 +1,44 @@
+import json
+from typing import Literal
 from uuid import UUID
 
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Double, and_, exists, func, or_, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager
 
 from core.auth.auth import get_current_user
-from core.db import get_db
-from core.exception import NotFound
+from core.cache import cache, cached_response
+from core.catalog_import import import_catalog
+from core.conditional import compute_validators, row_version
+from core.db import get_db, get_read_db, missing_ids
+from core.db.loading import load_plan
+from core.exception import BadRequest, NotFound
+from core.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    PageParams,
+    apply_keyset,
+    build_page,
+    decode_ranked_cursor,
+    encode_ranked_cursor,
+)
+from core.search import prefix_tsquery
+from core.serialization import json_response
 from models.book import Bookmark, Category, EBook, EBookTag, Tag
+from schema import Page
 from schema.book import (
+    BookmarkGroupSchema,
+    BookmarkResponse,
+    BulkTagResult,
     CategoryCreateSchema,
     CategoryResponse,
     EBookCreateSchema,
     EBookSchema,
+    EBookSearchPage,
+    EBookSummarySchema,
     TagCreateSchema,
     TagResponseSchema,
 )
@@ -19,86 +46,369 @@ from schema.book import (
 app = APIRouter()
 
 
-@app.get("/categories", response_model=list[CategoryResponse] | CategoryResponse)
-def get_categories(id: UUID | None = None, db: Session = Depends(get_db)):
-    return Category.get(db=db, id=id)
+class ImportProgressResponse(StreamingResponse):
+    """Streams without Starlette's disconnect listener.
+
+    That listener reads from ``receive`` concurrently with the body iterator,
+    which would swallow request-body messages the import is still consuming.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+
+def response_rows(model, id: UUID | None, page: PageParams):
+    """``(id, updated_at)`` of the rows a lookup or list page is built from.
+
+    A page includes the extra row that decides whether there is a next
+    cursor.
+    """
+    query = select(model.id, model.updated_at).where(
+        model.is_deleted.is_(False), model.is_active
+    )
+    if id is not None:
+        return query.where(model.id == id).subquery()
+    return apply_keyset(query, model.id, page).subquery()
+
+
+def ebook_versions(rows) -> tuple:
+    """Row versions behind ``EBookSchema``: the ebooks, tags and bookmarks."""
+    ids = select(rows.c.id)
+    return (
+        select(*row_version("ebook", rows.c.updated_at, rows.c.id)),
+        select(
+            *row_version(
+                "ebooktag", EBookTag.updated_at, EBookTag.ebook_id, EBookTag.tag_id
+            )
+        ).where(EBookTag.ebook_id.in_(ids)),
+        select(*row_version("tag", Tag.updated_at, Tag.id))
+        .join(EBookTag, EBookTag.tag_id == Tag.id)
+        .where(EBookTag.ebook_id.in_(ids)),
+        select(*row_version("bookmark", Bookmark.updated_at, Bookmark.id)).where(
+            Bookmark.ebook_id.in_(ids)
+        ),
+    )
+
+
+@app.get("/categories", response_model=Page[CategoryResponse] | CategoryResponse)
+async def get_categories(
+    request: Request,
+    id: UUID | None = None,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_db),
+):
+    async def load():
+        if id is None:
+            return await Category.paginate(
+                db=db, page=page, options=load_plan(Category, CategoryResponse)
+            )
+        category = await Category.get(
+            db=db, id=id, options=load_plan(Category, CategoryResponse)
+        )
+        if category is None:
+            # Raised before anything is cached, so the miss is not.
+            raise NotFound(msg=f"Category with id {id} not found")
+        return category
+
+    async def validate():
+        rows = response_rows(Category, id, page)
+        return await compute_validators(
+            db,
+            select(*row_version("category", rows.c.updated_at, rows.c.id)),
+            last_modified=id is not None,
+        )
+
+    key = (id, page.limit, page.cursor, page.reverse)
+    response_type = Page[CategoryResponse] if id is None else CategoryResponse
+    return await cached_response(
+        request, "categories", key, response_type, load, validate
+    )
 
 
 @app.post("/categories", response_model=CategoryResponse)
-def create_category(category: CategoryCreateSchema, db: Session = Depends(get_db)):
-    return Category(**category.model_dump()).create(db=db)
+async def create_category(
+    category: CategoryCreateSchema, db: AsyncSession = Depends(get_db)
+):
+    category = await Category(**category.model_dump()).create(db=db)
+    await cache.invalidate("categories")
+    return category
+
+
+@app.get("/tags", response_model=Page[TagResponseSchema] | TagResponseSchema)
+async def get_tags(
+    request: Request,
+    id: UUID | None = None,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_db),
+):
+    async def load():
+        if id is None:
+            return await Tag.paginate(
+                db=db, page=page, options=load_plan(Tag, TagResponseSchema)
+            )
+        tag = await Tag.get(db=db, id=id, options=load_plan(Tag, TagResponseSchema))
+        if tag is None:
+            raise NotFound(msg=f"Tag with id {id} not found")
+        return tag
 
+    async def validate():
+        rows = response_rows(Tag, id, page)
+        return await compute_validators(
+            db,
+            select(*row_version("tag", rows.c.updated_at, rows.c.id)),
+            last_modified=id is not None,
+        )
 
-@app.get("/tags", response_model=list[TagResponseSchema] | TagResponseSchema)
-def get_tags(id: UUID | None = None, db: Session = Depends(get_db)):
-    return Tag.get(db=db, id=id)
+    key = (id, page.limit, page.cursor, page.reverse)
+    response_type = Page[TagResponseSchema] if id is None else TagResponseSchema
+    return await cached_response(request, "tags", key, response_type, load, validate)
 
 
 @app.post("/tags", response_model=TagResponseSchema)
-def create_tag(tag: TagCreateSchema, db: Session = Depends(get_db)):
-    return Tag(**tag.model_dump()).create(db=db)
+async def create_tag(tag: TagCreateSchema, db: AsyncSession = Depends(get_db)):
+    tag = await Tag(**tag.model_dump()).create(db=db)
+    await cache.invalidate("tags")
+    return tag
+
+
+@app.get("/ebooks", response_model=Page[EBookSchema] | EBookSchema)
+async def get_ebooks(
+    request: Request,
+    id: UUID | None = None,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_read_db),
+):
+    validators = await compute_validators(
+        db,
+        *ebook_versions(response_rows(EBook, id, page)),
+        last_modified=id is not None,
+    )
+    if id is not None and not validators.found:
+        raise NotFound(msg=f"EBook with id {id} not found")
+    if validators.matches(request):
+        return validators.not_modified()
+    if id is None:
+        result = await EBook.paginate(
+            db=db, page=page, options=load_plan(EBook, EBookSchema)
+        )
+        return json_response(Page[EBookSchema], result, headers=validators.headers)
+    ebook = await EBook.get(db=db, id=id, options=load_plan(EBook, EBookSchema))
+    if ebook is None:
+        raise NotFound(msg=f"EBook with id {id} not found")
+    return json_response(EBookSchema, ebook, headers=validators.headers)
+
 
+@app.get("/ebooks/search", response_model=EBookSearchPage)
+async def search_ebooks(
+    q: str = Query(min_length=1, max_length=200),
+    category_id: UUID | None = None,
+    tag_id: list[UUID] = Query(default=[]),
+    facets: bool = False,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Ranked full-text search over title, author and description.
+
+    Every word is prefix-matched and all must match. Results are ordered on
+    ``ts_rank`` then id, and paged with a ``(rank, id)`` keyset cursor. With
+    ``facets=true`` the first page also carries per-category and per-tag
+    counts for the whole match set.
+    """
+    terms = prefix_tsquery(q)
+    if not terms:
+        raise BadRequest(msg="Search query has no words", loc=["query", "q"])
+    tsquery = func.to_tsquery("english", terms)
+    # Compared in double precision so the cursor round-trips exactly.
+    rank = func.ts_rank(EBook.search_vector, tsquery).cast(Double)
+    matches = [
+        EBook.search_vector.op("@@")(tsquery),
+        EBook.is_deleted.is_(False),
+        EBook.is_active,
+    ]
+    if category_id is not None:
+        matches.append(EBook.category_id == category_id)
+    for id in tag_id:
+        matches.append(
+            exists().where(EBookTag.ebook_id == EBook.id, EBookTag.tag_id == id)
+        )
+
+    query = select(EBook, rank).where(*matches)
+    if cursor is not None:
+        last_rank, last_id = decode_ranked_cursor(cursor)
+        query = query.where(
+            or_(rank < last_rank, and_(rank == last_rank, EBook.id > last_id))
+        )
+    query = (
+        query.order_by(rank.desc(), EBook.id)
+        .limit(limit + 1)
+        .options(*load_plan(EBook, EBookSchema))
+    )
+    rows = (await db.execute(query)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_ranked_cursor(rows[-1][1], rows[-1][0].id)
 
-@app.get("/ebooks", response_model=list[EBookSchema] | EBookSchema)
-def get_ebooks(id: UUID | None = None, db: Session = Depends(get_db)):
-    return EBook.get(db=db, id=id)
+    result = {"items": [ebook for ebook, _ in rows], "next_cursor": next_cursor}
+    if facets and cursor is None:
+        matched = select(EBook.id, EBook.category_id).where(*matches).subquery()
+        count = func.count().label("count")
+        categories = await db.execute(
+            select(Category.id, Category.name, count)
+            .join(matched, matched.c.category_id == Category.id)
+            .where(Category.is_deleted.is_(False), Category.is_active)
+            .group_by(Category.id)
+            .order_by(count.desc())
+        )
+        tags = await db.execute(
+            select(Tag.id, Tag.name, count)
+            .join(EBookTag, EBookTag.tag_id == Tag.id)
+            .join(matched, matched.c.id == EBookTag.ebook_id)
+            .where(Tag.is_deleted.is_(False), Tag.is_active)
+            .group_by(Tag.id)
+            .order_by(count.desc())
+        )
+        result["facets"] = {
+            "categories": categories.mappings().all(),
+            "tags": tags.mappings().all(),
+        }
+    return json_response(EBookSearchPage, result)
 
 
 @app.post("/ebooks", response_model=EBookSchema)
-def create_ebook(ebook: EBookCreateSchema, db: Session = Depends(get_db)):
-    return EBook(**ebook.model_dump()).create(db=db)
+async def create_ebook(ebook: EBookCreateSchema, db: AsyncSession = Depends(get_db)):
+    ebook = await EBook(**ebook.model_dump()).create(db=db)
+    return await EBook.get(db=db, id=ebook.id, options=load_plan(EBook, EBookSchema))
+
+
+@app.post("/ebooks/import")
+async def import_ebooks(
+    request: Request, format: Literal["ndjson", "csv"] | None = None
+):
+    """Stream an NDJSON or CSV catalog feed into ``ebook`` via COPY.
+
+    The body is consumed as it arrives and the response streams one NDJSON
+    progress report per chunk (row errors, running totals, rows/sec).
+    """
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "csv" if "csv" in content_type else "ndjson"
+    reports = import_catalog(request.stream(), format)
+    return ImportProgressResponse(
+        (json.dumps(report, default=str) + "\n" async for report in reports),
+        media_type="application/x-ndjson",
+    )
+
+
+@app.put("/ebooks/tags", response_model=BulkTagResult)
+async def add_tags_to_ebooks(
+    tags_by_ebook: dict[UUID, list[UUID]],
+    db: AsyncSession = Depends(get_db),
+):
+    """Tag many ebooks at once: ``{ebook_id: [tag_id, ...]}``.
+
+    Either every link is written or, if an ebook or tag does not exist,
+    none is.
+    """
+    if missing := await missing_ids(db, EBook, tags_by_ebook):
+        raise NotFound(msg=f"EBooks not found: {sorted(map(str, missing))[:20]}")
+    tag_ids = {tag_id for ids in tags_by_ebook.values() for tag_id in ids}
+    if missing := await missing_ids(db, Tag, tag_ids):
+        raise NotFound(msg=f"Tags not found: {sorted(map(str, missing))[:20]}")
+    created = await EBookTag.attach(db=db, tags_by_ebook=tags_by_ebook)
+    return BulkTagResult(ebooks=len(tags_by_ebook), links_created=created)
 
 
 @app.put("/ebooks/tags/{ebook_id}", response_model=EBookSchema)
-def add_tags_to_ebook(
+async def add_tags_to_ebook(
     ebook_id: UUID,
     tag_ids: list[UUID],
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    book = EBook.get(db=db, id=ebook_id)
+    book = await EBook.get(db=db, id=ebook_id)
     if not book:
         raise NotFound(msg=f"EBook with id {ebook_id} not found")
-    tags = db.query(Tag).filter(Tag.id.in_(tag_ids)).all()
-    if len(tags) != len(tag_ids):
-        missing_ids = set(tag_ids) - {tag.id for tag in tags}
-        raise NotFound(msg=f"Tags not found: {missing_ids}")
-    for tag in tags:
-        _ = EBookTag(ebook_id=ebook_id, tag_id=tag.id).create(db=db)
-    print(book.tags[0].tag.name)
-    return book
+    if missing := await missing_ids(db, Tag, tag_ids):
+        raise NotFound(msg=f"Tags not found: {missing}")
+    _ = await EBookTag.attach(db=db, tags_by_ebook={ebook_id: tag_ids})
+    return await EBook.get(db=db, id=ebook_id, options=load_plan(EBook, EBookSchema))
+
+
+def bookmarked_ebooks_query(user_id):
+    """The ebooks ``user_id`` has bookmarked, carrying only their bookmarks.
+
+    The join only matches the caller's bookmarks and contains_eager fills
+    EBook.bookmarks from those same rows, so other users' bookmarks on a
+    popular book are never loaded.
+    """
+    return (
+        select(EBook)
+        .join(
+            EBook.bookmarks.and_(
+                Bookmark.user_id == user_id,
+                Bookmark.is_deleted.is_(False),
+                Bookmark.is_active,
+            )
+        )
+        .where(EBook.is_deleted.is_(False), EBook.is_active)
+        .order_by(EBook.id, Bookmark.page_number)
+        .options(
+            contains_eager(EBook.bookmarks),
+            *load_plan(EBook, EBookSchema, exclude=("bookmarks",)),
+        )
+        .execution_options(populate_existing=True)
+    )
 
 
 @app.get("/user/bookmarks", response_model=list[EBookSchema])
-def get_my_bookmarks(
+async def get_my_bookmarks(
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    book = await db.scalars(bookmarked_ebooks_query(current_user["sub"]))
+    return json_response(list[EBookSchema], book.unique().all())
+
+
+@app.get("/user/bookmarks/grouped", response_model=Page[BookmarkGroupSchema])
+async def get_my_bookmarks_grouped(
+    page: PageParams = Depends(),
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    user_id = current_user["sub"]
-    book = db.query(EBook).join(EBook.bookmarks).filter_by(user_id=user_id).all()
-    return book
+    """The caller's bookmarks as ``ebook -> [pages]``, paged by ebook."""
+    pages = func.array_agg(
+        aggregate_order_by(Bookmark.page_number, Bookmark.page_number)
+    )
+    query = (
+        select(EBook, pages)
+        .join(EBook.bookmarks)
+        .where(
+            Bookmark.user_id == current_user["sub"],
+            Bookmark.is_deleted.is_(False),
+            Bookmark.is_active,
+            EBook.is_deleted.is_(False),
+            EBook.is_active,
+        )
+        .group_by(EBook.id)
+        .options(*load_plan(EBook, EBookSummarySchema))
+    )
+    rows = (await db.execute(apply_keyset(query, EBook.id, page))).all()
+    result = build_page(rows, page, key=lambda row: row[0].id)
+    result["items"] = [
+        {"ebook": ebook, "pages": pages} for ebook, pages in result["items"]
+    ]
+    return json_response(Page[BookmarkGroupSchema], result)
 
 
-@app.post("/user/bookmarks/{ebook_id}", response_model=EBookSchema)
-def add_bookmark(
+@app.post("/user/bookmarks/{ebook_id}", response_model=BookmarkResponse)
+async def add_bookmark(
     ebook_id: UUID,
     page_number: int,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    user_id = current_user["sub"]
-    ebook = EBook.get(db=db, id=ebook_id)
-    if not ebook:
+    bookmark = await Bookmark.add(db, current_user["sub"], ebook_id, page_number)
+    if bookmark is None:
         raise NotFound(msg=f"EBook with id {ebook_id} not found")
-    bookmark = (
-        db.query(Bookmark)
-        .filter_by(user_id=user_id, ebook_id=ebook_id, page_number=page_number)
-        .first()
-    )
-    if bookmark:
-        return ebook
-    _ = ebook.bookmarks.append(
-        Bookmark(user_id=user_id, ebook_id=ebook_id, page_number=page_number)
-    )
-    db.commit()
-    db.refresh(ebook)
-    return ebook
+    return bookmark
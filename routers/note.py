@@ -0,0 +1,162 @@
+from uuid import UUID
+
+from fastapi import APIRouter, Body, Depends, Query
+from sqlalchemy import Double, and_, any_, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.auth.auth import get_current_user
+from core.db import get_db, get_read_db, missing_ids, uuid_array
+from core.exception import BadRequest, NotFound
+from core.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    decode_position_cursor,
+    decode_ranked_cursor,
+    encode_position_cursor,
+    encode_ranked_cursor,
+)
+from core.search import prefix_tsquery
+from core.serialization import json_response
+from models.book import EBook, Note
+from schema import Page
+from schema.note import (
+    MAX_NOTE_BATCH,
+    NoteCreateSchema,
+    NoteDeleteResult,
+    NoteSchema,
+    NoteUpdateSchema,
+)
+
+app = APIRouter()
+
+
+def live_notes(user_id):
+    return (Note.user_id == user_id, Note.is_deleted.is_(False), Note.is_active)
+
+
+@app.post("/user/notes", response_model=list[NoteSchema])
+async def create_notes(
+    notes: list[NoteCreateSchema] = Body(min_length=1, max_length=MAX_NOTE_BATCH),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Create a batch of notes with one multi-row insert.
+
+    Either every note is written or, if an ebook does not exist, none is.
+    Notes come back in the order they were sent.
+    """
+    if missing := await missing_ids(db, EBook, {note.ebook_id for note in notes}):
+        raise NotFound(msg=f"EBooks not found: {sorted(map(str, missing))[:20]}")
+    created = await Note.add_many(db, current_user["sub"], notes)
+    return json_response(list[NoteSchema], created)
+
+
+@app.patch("/user/notes", response_model=list[NoteSchema])
+async def update_notes(
+    changes: list[NoteUpdateSchema] = Body(min_length=1, max_length=MAX_NOTE_BATCH),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Edit a batch of the caller's notes with one UPDATE.
+
+    Omitted fields keep their value. Either every note is updated or, if one
+    is not the caller's live note, none is.
+    """
+    ids = [change.id for change in changes]
+    if len(set(ids)) != len(ids):
+        raise BadRequest(msg="A note is listed more than once", loc=["body"])
+    found = await db.scalars(
+        select(Note.id).where(
+            Note.id == any_(uuid_array(ids)), *live_notes(current_user["sub"])
+        )
+    )
+    if missing := set(ids) - set(found):
+        raise NotFound(msg=f"Notes not found: {sorted(map(str, missing))[:20]}")
+    updated = await Note.update_many(db, current_user["sub"], changes)
+    return json_response(list[NoteSchema], updated)
+
+
+@app.delete("/user/notes", response_model=NoteDeleteResult)
+async def delete_notes(
+    ids: list[UUID] = Body(min_length=1, max_length=MAX_NOTE_BATCH),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Soft-delete a batch of the caller's notes; unknown ids are ignored."""
+    deleted = await Note.delete_many(db, current_user["sub"], ids)
+    return NoteDeleteResult(deleted=deleted)
+
+
+@app.get("/user/notes/search", response_model=Page[NoteSchema])
+async def search_notes(
+    q: str = Query(min_length=1, max_length=200),
+    ebook_id: UUID | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Ranked full-text search over the caller's notes.
+
+    Words are prefix-matched as in ``/ebooks/search``, and results are paged
+    the same way, with a ``(rank, id)`` keyset cursor.
+    """
+    terms = prefix_tsquery(q)
+    if not terms:
+        raise BadRequest(msg="Search query has no words", loc=["query", "q"])
+    tsquery = func.to_tsquery("english", terms)
+    rank = func.ts_rank(Note.search_vector, tsquery).cast(Double)
+    query = select(Note, rank).where(
+        Note.search_vector.op("@@")(tsquery), *live_notes(current_user["sub"])
+    )
+    if ebook_id is not None:
+        query = query.where(Note.ebook_id == ebook_id)
+    if cursor is not None:
+        last_rank, last_id = decode_ranked_cursor(cursor)
+        query = query.where(
+            or_(rank < last_rank, and_(rank == last_rank, Note.id > last_id))
+        )
+    rows = (
+        await db.execute(query.order_by(rank.desc(), Note.id).limit(limit + 1))
+    ).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_ranked_cursor(rows[-1][1], rows[-1][0].id)
+    result = {"items": [note for note, _ in rows], "next_cursor": next_cursor}
+    return json_response(Page[NoteSchema], result)
+
+
+@app.get("/user/notes/{ebook_id}", response_model=Page[NoteSchema])
+async def get_notes(
+    ebook_id: UUID,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_NOTE_BATCH),
+    cursor: str | None = None,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """The caller's notes on one ebook in page order.
+
+    Paged with a ``(page_number, id)`` keyset cursor; each page is a range
+    scan of the ``(user_id, ebook_id, page_number)`` index. A page holds up
+    to :data:`MAX_NOTE_BATCH` notes, so most books sync in one request.
+    """
+    query = select(Note).where(
+        Note.ebook_id == ebook_id, *live_notes(current_user["sub"])
+    )
+    if cursor is not None:
+        last_page, last_id = decode_position_cursor(cursor)
+        query = query.where(
+            or_(
+                Note.page_number > last_page,
+                and_(Note.page_number == last_page, Note.id > last_id),
+            )
+        )
+    notes = (
+        await db.scalars(query.order_by(Note.page_number, Note.id).limit(limit + 1))
+    ).all()
+    next_cursor = None
+    if len(notes) > limit:
+        notes = notes[:limit]
+        next_cursor = encode_position_cursor(notes[-1].page_number, notes[-1].id)
+    return json_response(Page[NoteSchema], {"items": notes, "next_cursor": next_cursor})
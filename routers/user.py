@@ -1,16 +1,50 @@
+from datetime import datetime, timedelta, timezone
 from uuid import UUID
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, BackgroundTasks, Depends, Query
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import (
+    Boolean,
+    DateTime,
+    Integer,
+    String,
+    Uuid,
+    and_,
+    bindparam,
+    exists,
+    func,
+    literal,
+    or_,
+    select,
+    tuple_,
+    union_all,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from core.auth.auth import get_current_user, login_for_access_token
-from core.db import get_db
+from config import db_config
+from core.auth.auth import (
+    get_current_user,
+    login_for_access_token,
+    refresh_access_token,
+)
+from core.db import get_db, get_read_db
+from core.db.loading import load_plan
+from core.db.write_behind import reading_progress
 from core.exception import AUTHENTICATION_EXCEPTION, BadRequest, NotFound
+from core.pagination import (
+    PageParams,
+    decode_position_cursor,
+    encode_position_cursor,
+)
+from core.serialization import json_response
+from models.book import Bookmark, Note
 from models.user import User, UserReadingSession
+from schema import Page
 from schema.user import (
     MessageResponse,
     PasswordUpdate,
+    RefreshTokenRequest,
+    SyncResponse,
     Token,
     UserCreate,
     UserReadingSessionSchema,
@@ -21,46 +55,68 @@ app = APIRouter()
 
 
 @app.post("/login")
-def login(
+async def login(
+    background_tasks: BackgroundTasks,
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
+) -> Token:
+    return await login_for_access_token(
+        form_data.username, form_data.password, db, background_tasks
+    )
+
+
+@app.post("/token/refresh")
+async def refresh_token(
+    body: RefreshTokenRequest,
+    db: AsyncSession = Depends(get_db),
 ) -> Token:
-    return login_for_access_token(form_data.username, form_data.password, db)
+    return await refresh_access_token(body.refresh_token, db)
 
 
 @app.get("/me")
-def read_users_me(detail=Depends(get_current_user)):
+async def read_users_me(detail=Depends(get_current_user)):
     return detail
 
 
-@app.get("/user", response_model=list[UserSchema] | UserSchema)
-def get_user(id: UUID | None = None, db: Session = Depends(get_db)):
-    return User.get(db=db, id=id)
+@app.get("/user", response_model=Page[UserSchema] | UserSchema)
+async def get_user(
+    id: UUID | None = None,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_read_db),
+):
+    if id is None:
+        users = await User.paginate(
+            db=db, page=page, options=load_plan(User, UserSchema)
+        )
+        return json_response(Page[UserSchema], users)
+    return await User.get(db=db, id=id, options=load_plan(User, UserSchema))
 
 
 @app.post("/user", response_model=UserSchema)
-def create_user(user: UserCreate, db: Session = Depends(get_db)):
-    return User(**user.model_dump()).create(db=db)
+async def create_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
+    return await User(**user.model_dump()).create(db=db)
 
 
 @app.delete("/user")
-def delete_user(data: dict = Depends(get_current_user), db: Session = Depends(get_db)):
-    user: User = User.get(db=db, id=data["sub"])
+async def delete_user(
+    data: dict = Depends(get_current_user), db: AsyncSession = Depends(get_db)
+):
+    user: User = await User.get(db=db, id=data["sub"])
     if user:
-        _ = user.soft_delete(db=db)
+        _ = await user.soft_delete(db=db)
         return MessageResponse(detail="User deleted successfully")
     return MessageResponse(detail="User not found")
 
 
 @app.put("/user", response_model=UserSchema)
-def change_password(
+async def change_password(
     password_data: PasswordUpdate,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    user: User = User.get(db=db, id=current_user["sub"])
+    user: User = await User.get(db=db, id=current_user["sub"])
     if user:
-        return user.update_password(
+        return await user.update_password(
             old_password=password_data.old_password,
             new_password=password_data.new_password,
             db=db,
@@ -68,65 +124,245 @@ def change_password(
     raise AUTHENTICATION_EXCEPTION
 
 
+def with_pending_progress(session: UserReadingSession):
+    """Show a page turn still sitting in the write-behind buffer."""
+    if reading_progress is None:
+        return session
+    return {
+        "id": session.id,
+        "ebook_id": session.ebook_id,
+        "last_page": reading_progress.latest(session.id, session.last_page),
+    }
+
+
 @app.get(
     "/user/reading-sessions",
     response_model=list[UserReadingSessionSchema] | UserReadingSessionSchema,
 )
-def get_reading_sessions(
+async def get_reading_sessions(
     id: UUID | None = None,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    user: User = User.get(db=db, id=current_user["sub"])
+    user: User = await User.get(db=db, id=current_user["sub"])
     if user and not id:
-        return user.reading_sessions
+        sessions = await db.scalars(
+            select(UserReadingSession).where(UserReadingSession.user_id == user.id)
+        )
+        return [with_pending_progress(session) for session in sessions]
     if id:
-        session = UserReadingSession.get(db=db, id=id)
+        session = await UserReadingSession.get(db=db, id=id)
         if not session or session.user_id != user.id:
             raise NotFound(msg="Reading session not found")
-        return session
+        return with_pending_progress(session)
 
 
 @app.post("/user/reading-sessions/{ebook_id}", response_model=UserReadingSessionSchema)
-def create_reading_session(
+async def create_reading_session(
     ebook_id: UUID,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    user: User = User.get(db=db, id=current_user["sub"])
-    if not user:
-        raise NotFound(msg="User not found")
-    previous_session = (
-        db.query(UserReadingSession)
-        .where(
-            UserReadingSession.ebook_id == ebook_id,
-            UserReadingSession.user_id == user.id,
+    session = await UserReadingSession.start(db, current_user["sub"], ebook_id)
+    if session is not None:
+        return session
+    # Nothing was inserted; one more query on this error path says why.
+    existing, user_exists = (
+        await db.execute(
+            select(
+                exists().where(
+                    UserReadingSession.user_id == current_user["sub"],
+                    UserReadingSession.ebook_id == ebook_id,
+                ),
+                exists().where(
+                    User.id == current_user["sub"],
+                    User.is_deleted.is_(False),
+                    User.is_active,
+                ),
+            )
         )
-        .first()
-    )
-    if previous_session:
+    ).one()
+    if existing:
         raise BadRequest(msg="Reading session already exists")
-    return UserReadingSession(user_id=user.id, ebook_id=ebook_id, last_page=0).create(
-        db=db
-    )
+    if not user_exists:
+        raise NotFound(msg="User not found")
+    raise NotFound(msg=f"EBook with id {ebook_id} not found")
 
 
 @app.put("/user/reading-sessions/{session_id}", response_model=UserReadingSessionSchema)
-def update_reading_session(
+async def update_reading_session(
     session_id: UUID,
     last_page: int,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    session = (
-        db.query(UserReadingSession)
-        .filter(
+    if reading_progress is not None:
+        owner = await reading_progress.owner(db, session_id)
+        if owner is None or str(owner[0]) != current_user["sub"]:
+            raise NotFound(msg="Reading session not found")
+        reading_progress.record(session_id, last_page)
+        return {"id": session_id, "ebook_id": owner[1], "last_page": last_page}
+    session = await db.scalar(
+        select(UserReadingSession).where(
             UserReadingSession.id == session_id,
             UserReadingSession.user_id == current_user["sub"],
         )
-        .first()
     )
     if not session:
         raise NotFound(msg="Reading session not found")
     session.last_page = last_page
-    return session.update(db=db)
+    return await session.update(db=db)
+
+
+# GET /user/sync: (type, model, page column) of each synced table.
+SYNCED = (
+    ("bookmark", Bookmark, Bookmark.page_number),
+    ("reading_session", UserReadingSession, UserReadingSession.last_page),
+    ("note", Note, Note.page_number),
+)
+SYNC_PAGE_SIZE = 500
+MAX_SYNC_PAGE_SIZE = 1000
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def encode_sync_cursor(updated_at: datetime, id: UUID) -> str:
+    micros = (updated_at - EPOCH) // timedelta(microseconds=1)
+    return encode_position_cursor(micros, id)
+
+
+def decode_sync_cursor(cursor: str) -> tuple[datetime, UUID]:
+    micros, id = decode_position_cursor(cursor)
+    return EPOCH + timedelta(microseconds=micros), id
+
+
+def build_changes_query():
+    """The user's rows changed after a cursor and before a horizon.
+
+    One ``UNION ALL`` over the synced tables, ordered on ``(updated_at, id)``
+    and cut at ``limit + 1`` rows. Each branch is a range scan of its
+    ``(user_id, updated_at, id)`` index that stops after ``limit + 1`` rows,
+    so the cost follows the number of changes rather than the library size.
+    Built once; requests only bind ``user_id``, ``after_at``, ``after_id``,
+    ``horizon``, ``limit`` and ``with_deleted``.
+    """
+    after = tuple_(
+        bindparam("after_at", type_=DateTime(timezone=True)),
+        bindparam("after_id", type_=Uuid),
+    )
+    limit = bindparam("limit", type_=Integer) + 1
+    branches = []
+    for type, model, page in SYNCED:
+        live = and_(model.is_deleted.is_(False), model.is_active)
+        content = Note.content if model is Note else literal(None, String)
+        branches.append(
+            select(
+                literal(type).label("type"),
+                model.id,
+                model.updated_at,
+                model.deleted_at,
+                live.label("live"),
+                model.ebook_id,
+                page.label("page"),
+                content.label("content"),
+            )
+            .where(
+                model.user_id == bindparam("user_id", type_=Uuid),
+                model.updated_at < bindparam("horizon", type_=DateTime(timezone=True)),
+                tuple_(model.updated_at, model.id) > after,
+                or_(bindparam("with_deleted", type_=Boolean), live),
+            )
+            .order_by(model.updated_at, model.id)
+            .limit(limit)
+        )
+    changes = union_all(*branches).subquery()
+    return select(changes).order_by(changes.c.updated_at, changes.c.id).limit(limit)
+
+
+CHANGES_QUERY = build_changes_query()
+
+
+@app.get("/user/sync", response_model=SyncResponse)
+async def sync(
+    cursor: str | None = None,
+    limit: int = Query(SYNC_PAGE_SIZE, ge=1, le=MAX_SYNC_PAGE_SIZE),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Bookmarks, reading sessions and notes changed since ``cursor``.
+
+    Without a cursor this is a full sync of the live rows. With one, rows
+    created or updated since come back whole and deleted ones as tombstones.
+    Pass the returned ``cursor`` next time; changes from the last
+    ``SYNC_SETTLE_SECONDS`` are held back until then.
+
+    A cursor from before ``ARCHIVE_AFTER_DAYS`` may predate deletions whose
+    tombstones have since been archived, so it restarts a full sync with
+    ``reset`` set. Served from the primary: on a replica the horizon would
+    not account for WAL still to be replayed.
+    """
+    after = decode_sync_cursor(cursor) if cursor is not None else None
+    archived_before = datetime.now(tz=timezone.utc) - timedelta(
+        days=db_config.archive_after_days
+    )
+    reset = after is not None and after[0] < archived_before
+    if reset:
+        after = None
+    horizon = await db.scalar(
+        select(func.now() - timedelta(seconds=db_config.sync_settle_seconds))
+    )
+    rows = (
+        await db.execute(
+            CHANGES_QUERY,
+            {
+                "user_id": current_user["sub"],
+                "after_at": after[0] if after else EPOCH,
+                "after_id": after[1] if after else UUID(int=0),
+                "horizon": horizon,
+                "limit": limit,
+                # A full sync only needs the live rows.
+                "with_deleted": after is not None,
+            },
+        )
+    ).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    result = {
+        "bookmarks": [],
+        "reading_sessions": [],
+        "notes": [],
+        "deleted": [],
+        # Once drained, everything before the horizon has been sent.
+        "cursor": encode_sync_cursor(
+            *(
+                (rows[-1].updated_at, rows[-1].id)
+                if has_more
+                else (horizon, UUID(int=0))
+            )
+        ),
+        "has_more": has_more,
+        "reset": reset,
+    }
+    for row in rows:
+        if not row.live:
+            result["deleted"].append(
+                {"type": row.type, "id": row.id, "deleted_at": row.deleted_at}
+            )
+        elif row.type == "bookmark":
+            result["bookmarks"].append(
+                {"id": row.id, "ebook_id": row.ebook_id, "page_number": row.page}
+            )
+        elif row.type == "reading_session":
+            result["reading_sessions"].append(
+                {"id": row.id, "ebook_id": row.ebook_id, "last_page": row.page}
+            )
+        else:
+            result["notes"].append(
+                {
+                    "id": row.id,
+                    "ebook_id": row.ebook_id,
+                    "page_number": row.page,
+                    "content": row.content,
+                }
+            )
+    return json_response(SyncResponse, result)
@@ -1,6 +1,15 @@
+from typing import Generic, TypeVar
+
 from pydantic import BaseModel
 
+T = TypeVar("T")
+
 
 class SchemaBase(BaseModel):
     class Config:
         from_attributes = True
+
+
+class Page(SchemaBase, Generic[T]):
+    items: list[T]
+    next_cursor: str | None = None
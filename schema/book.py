@@ -1,6 +1,8 @@
 from uuid import UUID
 
-from schema import SchemaBase
+from pydantic import Field, model_validator
+
+from schema import Page, SchemaBase
 
 
 class CategoryCreateSchema(SchemaBase):
@@ -29,6 +31,31 @@ class EBookCreateSchema(SchemaBase):
     category_id: UUID
 
 
+class EBookImportSchema(EBookCreateSchema):
+    """One row of a bulk catalog import.
+
+    Rows may name their category instead of giving its id, and may carry an
+    ``id`` so re-importing a feed updates books instead of duplicating them.
+    Lengths mirror the column sizes so a bad row is rejected on its own
+    instead of failing the whole COPY.
+    """
+
+    id: UUID | None = None
+    title: str = Field(max_length=255)
+    author: str = Field(max_length=255)
+    description: str = Field(max_length=500)
+    file_url: str = Field(max_length=500)
+    cover_image: str | None = Field(None, max_length=500)
+    category_id: UUID | None = None
+    category: str | None = None
+
+    @model_validator(mode="after")
+    def check_category(self):
+        if self.category_id is None and not self.category:
+            raise ValueError("either category_id or category is required")
+        return self
+
+
 class TagSchema(SchemaBase):
     id: UUID
     name: str
@@ -43,7 +70,43 @@ class BookmarkSchema(SchemaBase):
     page_number: int
 
 
+class BookmarkResponse(BookmarkSchema):
+    ebook_id: UUID
+
+
 class EBookSchema(EBookCreateSchema):
     id: UUID
     tags: list[EbookTagSchema] = []
     bookmarks: list[BookmarkSchema] = []
+
+
+class EBookSummarySchema(SchemaBase):
+    id: UUID
+    title: str
+    author: str | None
+    cover_image: str | None
+
+
+class BookmarkGroupSchema(SchemaBase):
+    ebook: EBookSummarySchema
+    pages: list[int]
+
+
+class BulkTagResult(SchemaBase):
+    ebooks: int
+    links_created: int
+
+
+class FacetCount(SchemaBase):
+    id: UUID
+    name: str
+    count: int
+
+
+class SearchFacets(SchemaBase):
+    categories: list[FacetCount]
+    tags: list[FacetCount]
+
+
+class EBookSearchPage(Page[EBookSchema]):
+    facets: SearchFacets | None = None
@@ -0,0 +1,31 @@
+from uuid import UUID
+
+from pydantic import Field
+
+from schema import SchemaBase
+
+# Notes per create, update or delete request, and per listing page.
+MAX_NOTE_BATCH = 1000
+
+
+class NoteCreateSchema(SchemaBase):
+    ebook_id: UUID
+    page_number: int = Field(ge=0)
+    content: str = Field(min_length=1, max_length=1000)
+
+
+class NoteUpdateSchema(SchemaBase):
+    id: UUID
+    page_number: int | None = Field(None, ge=0)
+    content: str | None = Field(None, min_length=1, max_length=1000)
+
+
+class NoteSchema(SchemaBase):
+    id: UUID
+    ebook_id: UUID
+    page_number: int
+    content: str
+
+
+class NoteDeleteResult(SchemaBase):
+    deleted: int
@@ -1,8 +1,12 @@
+from datetime import datetime
+from typing import Literal
 from uuid import UUID
 
 from pydantic import EmailStr
 
 from schema import SchemaBase
+from schema.book import BookmarkResponse
+from schema.note import NoteSchema
 
 
 class Token(SchemaBase):
@@ -10,6 +14,10 @@ class Token(SchemaBase):
     refresh_token: str
 
 
+class RefreshTokenRequest(SchemaBase):
+    refresh_token: str
+
+
 class MessageResponse(SchemaBase):
     detail: str
 
@@ -35,3 +43,26 @@ class UserReadingSessionSchema(SchemaBase):
     id: UUID
     ebook_id: UUID
     last_page: int
+
+
+class Tombstone(SchemaBase):
+    type: Literal["bookmark", "reading_session", "note"]
+    id: UUID
+    deleted_at: datetime | None
+
+
+class SyncResponse(SchemaBase):
+    """Changes after the request's cursor, oldest first.
+
+    ``reset`` means the cursor was too old to say what was deleted since:
+    the response starts a full sync and the client should drop its copy.
+    Keep requesting with ``cursor`` while ``has_more``.
+    """
+
+    bookmarks: list[BookmarkResponse] = []
+    reading_sessions: list[UserReadingSessionSchema] = []
+    notes: list[NoteSchema] = []
+    deleted: list[Tombstone] = []
+    cursor: str
+    has_more: bool
+    reset: bool = False